@@ -0,0 +1,158 @@
+"""Scale-tier benchmark for the analysis, charting and PDF stages.
+
+Generates deterministic fixtures for every (rows, files) tier, times DataAnalyzer.analyze_source (plus
+analyze_combined when there are several files), ChartGenerator.generate_all_charts and
+PDFReportGenerator.create_report separately, and appends one JSON line per tier to a history file. Each stage is
+compared with the previous run of the same tier on the same machine; a slowdown beyond --threshold is reported as a
+regression and makes the script exit with status 1.
+
+    python benchmarks/report_benchmark.py --rows 10K,1M --files 1,10 [--repeat 3] [--threshold 0.1]
+"""
+import argparse
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+ROW_TIERS = {'10K': 10_000, '1M': 1_000_000, '10M': 10_000_000, '100M': 100_000_000}
+FILE_TIERS = (1, 10, 100, 1000)
+STAGES = ('analyze_source', 'analyze_combined', 'generate_all_charts', 'create_report')
+
+def prepare_fixtures(fixtures_dir, total_rows, num_files, spec, workers):
+    """Generates a tier's files once; the spec and seed make them identical on every machine, so they are reused."""
+    from storage_reporter.testdata import generate_part_files
+    tier_dir = fixtures_dir / f"{total_rows}-rows-{num_files}-files-{spec.file_format}-seed{spec.seed}"
+    marker = tier_dir / "complete"
+    if not marker.exists():
+        paths = generate_part_files(tier_dir, num_files, total_rows, spec, workers=workers)
+        marker.write_text("\n".join(paths))
+    return marker.read_text().splitlines()
+
+def time_tier(paths, config, threads, repeat):
+    """Best-of-`repeat` seconds for each stage, each repeat with a fresh connection and no caches."""
+    from storage_reporter.analyzer import DataAnalyzer, create_connection, source_stem
+    from storage_reporter.charting import ChartGenerator
+    from storage_reporter.reporter import PDFReportGenerator
+    best = {}
+    for _ in range(repeat):
+        timings = {}
+        with tempfile.TemporaryDirectory() as out_dir:
+            con = create_connection(threads)
+            analyzer = DataAnalyzer(con)
+            start = time.perf_counter()
+            sections = [{'title': f"Analysis for: {source_stem(p)}", 'aggs': analyzer.analyze_source(p), 'charts': {}} for p in paths]
+            timings['analyze_source'] = time.perf_counter() - start
+            if len(paths) > 1:
+                start = time.perf_counter()
+                sections.append({'title': "Combined Analysis of All Files", 'aggs': analyzer.analyze_combined(paths), 'charts': {}})
+                timings['analyze_combined'] = time.perf_counter() - start
+            con.close()
+
+            # Only the last (combined) section is charted, so chart time does not simply scale with the file count.
+            chart_generator = ChartGenerator(config, Path(out_dir) / "charts", use_cache=False)
+            start = time.perf_counter()
+            sections[-1]['charts'] = chart_generator.generate_all_charts(sections[-1]['aggs'], "benchmark")
+            timings['generate_all_charts'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            PDFReportGenerator(config, sections, Path(out_dir)).create_report()
+            timings['create_report'] = time.perf_counter() - start
+        for stage, seconds in timings.items():
+            best[stage] = min(best.get(stage, seconds), seconds)
+    return {stage: round(seconds, 4) for stage, seconds in best.items()}
+
+def previous_result(history_path, tier_key, machine):
+    if not history_path.exists():
+        return None
+    previous = None
+    for line in history_path.read_text().splitlines():
+        record = json.loads(line)
+        if record['tier'] == tier_key and record['machine'] == machine:
+            previous = record
+    return previous
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the report stages at fixed scale tiers and track regressions.")
+    parser.add_argument("--rows", default="10K,1M", help=f"Comma-separated total row tiers from {', '.join(ROW_TIERS)}.")
+    parser.add_argument("--files", default="1,10", help=f"Comma-separated file-count tiers from {', '.join(map(str, FILE_TIERS))}.")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Fixture file format.")
+    parser.add_argument("--seed", type=int, default=42, help="Fixture seed; keep it fixed to compare runs.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per tier; the fastest time of each stage is kept.")
+    parser.add_argument("--threads", type=int, default=max(1, os.cpu_count() or 1), help="DuckDB threads.")
+    parser.add_argument("--workers", type=int, default=max(1, os.cpu_count() or 1), help="Processes used to generate fixtures.")
+    parser.add_argument("--fixtures", default=str(ROOT / "benchmarks" / "fixtures"), help="Directory where generated fixtures are kept between runs.")
+    parser.add_argument("--history", default=str(ROOT / "benchmarks" / "history.jsonl"), help="JSON-lines file that results are appended to.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown of a stage that counts as a regression.")
+    args = parser.parse_args()
+
+    try:
+        row_tiers = [ROW_TIERS[t.strip().upper()] for t in args.rows.split(',')]
+        file_tiers = [int(t) for t in args.files.split(',')]
+    except (KeyError, ValueError):
+        parser.error(f"--rows takes tiers from {', '.join(ROW_TIERS)} and --files takes integers")
+    if any(f not in FILE_TIERS for f in file_tiers):
+        parser.error(f"--files takes tiers from {', '.join(map(str, FILE_TIERS))}")
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import duckdb
+    from storage_reporter.config import load_config
+    from storage_reporter.testdata import TestDataSpec
+    config = load_config(require_inputs=False)
+    spec = TestDataSpec(seed=args.seed, file_format=args.format)
+    machine = {'host': platform.node(), 'cpus': os.cpu_count(), 'threads': args.threads}
+    history_path = Path(args.history)
+    history_path.parent.mkdir(parents=True, exist_ok=True)
+
+    regressions = []
+    for total_rows in row_tiers:
+        for num_files in file_tiers:
+            tier_key = f"{total_rows}-rows/{num_files}-files/{args.format}"
+            print(f"\n⏱️  {tier_key}")
+            paths = prepare_fixtures(Path(args.fixtures), total_rows, num_files, spec, args.workers)
+            timings = time_tier(paths, config, args.threads, args.repeat)
+            previous = previous_result(history_path, tier_key, machine)
+            for stage in STAGES:
+                if stage not in timings:
+                    continue
+                line = f"  {stage:<20} {timings[stage]:>9.3f}s"
+                before = previous and previous['timings'].get(stage)
+                if before:
+                    change = timings[stage] / before - 1
+                    line += f"  ({change:+.1%} vs {previous['revision'] or 'previous'})"
+                    if change > args.threshold:
+                        line += "  ❌ regression"
+                        regressions.append((tier_key, stage, change))
+                print(line)
+            record = {
+                'timestamp': datetime.now().isoformat(timespec='seconds'), 'revision': git_revision(), 'tier': tier_key,
+                'rows': total_rows, 'files': num_files, 'format': args.format, 'seed': args.seed, 'repeat': args.repeat,
+                'machine': machine, 'python': platform.python_version(), 'duckdb': duckdb.__version__, 'timings': timings,
+            }
+            with history_path.open('a') as history:
+                history.write(json.dumps(record) + "\n")
+
+    print(f"\nResults appended to {history_path}.")
+    if regressions:
+        print(f"❌ {len(regressions)} stage(s) slowed down by more than {args.threshold:.0%}:")
+        for tier_key, stage, change in regressions:
+            print(f"   {tier_key} {stage}: {change:+.1%}")
+        sys.exit(1)
+    print("✅ No regressions.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Cold-start budget for the CLI entry point.
+
+Runs `python -X importtime main.py --help` several times and fails (exit status 1) when the fastest run's import
+time exceeds the budget or when any heavy library is imported before a report stage needs it.
+
+    python benchmarks/startup_benchmark.py [--budget-ms 150] [--runs 5] [-- main.py arguments]
+"""
+import argparse
+from pathlib import Path
+import subprocess
+import sys
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+# Libraries that only the analysis, charting, PDF or test-data stages may load.
+HEAVY_MODULES = ("duckdb", "pandas", "numpy", "pyarrow", "matplotlib", "fpdf", "PIL")
+
+def measure_startup(main_args):
+    """Returns (total top-level import microseconds, imported module names) for one cold run."""
+    result = subprocess.run([sys.executable, "-X", "importtime", str(MAIN), *main_args], capture_output=True, text=True)
+    total_us, modules = 0, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        modules.add(name.strip())
+        # Nested imports are indented under their parent; top-level cumulative times already include them.
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us, modules
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if the CLI's cold start exceeds its import-time budget.")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Maximum import time of the fastest run, in milliseconds.")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts to measure; the fastest one is compared to the budget.")
+    parser.add_argument("main_args", nargs="*", default=["--help"], help="Arguments passed to main.py (default: --help).")
+    args = parser.parse_args()
+
+    runs = [measure_startup(args.main_args) for _ in range(args.runs)]
+    best_ms = min(total for total, _ in runs) / 1000
+    heavy = sorted({m.split('.')[0] for _, modules in runs for m in modules if m.split('.')[0] in HEAVY_MODULES})
+    print(f"Startup imports: best {best_ms:.1f} ms over {args.runs} run(s) (budget {args.budget_ms:.0f} ms).")
+    failed = False
+    if best_ms > args.budget_ms:
+        print(f"❌ Import time exceeds the budget by {best_ms - args.budget_ms:.1f} ms.")
+        failed = True
+    if heavy:
+        print(f"❌ Heavy libraries imported at startup: {', '.join(heavy)}.")
+        failed = True
+    if not failed:
+        print("✅ Cold start is within budget.")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
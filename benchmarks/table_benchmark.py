@@ -0,0 +1,61 @@
+"""Time budget for the PDF appendix tables.
+
+Lays out an appendix listing --rows synthetic buckets (and as many projects) with PDFReportGenerator and writes the
+PDF, then fails (exit status 1) when layout plus output of the fastest run takes longer than the budget.
+
+    python benchmarks/table_benchmark.py [--rows 100000] [--budget-s 10] [--runs 3]
+"""
+import argparse
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+def listing(rows, name_col, seed):
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        name_col: [f"{name_col.split('_')[0]}-{i % 997}-archive-{i:07d}" for i in range(rows)],
+        'object_count': rng.integers(1, 10**8, rows),
+        'total_size': np.sort(rng.lognormal(30, 4, rows))[::-1],
+    })
+
+def time_appendix(config, aggs):
+    """Seconds to lay out the appendix section and to write the PDF, plus the page count."""
+    from storage_reporter.reporter import PDFReportGenerator
+    with tempfile.TemporaryDirectory() as out_dir:
+        generator = PDFReportGenerator(config, [], Path(out_dir))
+        generator.begin_report(["Appendix: All Projects and Buckets"])
+        start = time.perf_counter()
+        generator.add_section("Appendix: All Projects and Buckets", aggs, {})
+        layout = time.perf_counter() - start
+        start = time.perf_counter()
+        generator.finish_report()
+        return layout, time.perf_counter() - start, generator.pdf.page_no()
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if rendering full project and bucket listings exceeds its time budget.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows in each of the two listings.")
+    parser.add_argument("--budget-s", type=float, default=10.0, help="Maximum layout plus output seconds of the fastest run.")
+    parser.add_argument("--runs", type=int, default=3, help="Runs to measure; the fastest one is compared to the budget.")
+    args = parser.parse_args()
+
+    from storage_reporter.config import load_config
+    config = load_config(require_inputs=False)
+    aggs = {'project_listing': listing(args.rows, 'project_id', 1), 'bucket_listing': listing(args.rows, 'bucket_name', 2)}
+    runs = [time_appendix(config, aggs) for _ in range(args.runs)]
+    layout, output, pages = min(runs, key=lambda run: run[0] + run[1])
+    total = layout + output
+    print(f"Appendix of 2 x {args.rows:,} rows: {pages:,} pages, layout {layout:.2f}s + output {output:.2f}s = {total:.2f}s "
+          f"(budget {args.budget_s:.0f}s).")
+    if total > args.budget_s:
+        print(f"❌ Rendering exceeds the budget by {total - args.budget_s:.2f}s.")
+        sys.exit(1)
+    print("✅ Table rendering is within budget.")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,12 @@
 import argparse
 import os
 from pathlib import Path
-import duckdb
 import sys
-import time
-from storage_reporter.config import load_config
-from storage_reporter.utils import create_test_files
-from storage_reporter.analyzer import DataAnalyzer
-from storage_reporter.charting import ChartGenerator
-from storage_reporter.reporter import PDFReportGenerator
-import argparse
+from storage_reporter.config import EXPORT_FORMATS, load_config
+from storage_reporter.pipeline import ReportOptions, run_report
+
+# Only light modules are imported up front so --help and config errors return instantly; each stage imports its own
+# heavy libraries (see benchmarks/startup_benchmark.py).
 
 
 def main():
@@ -17,78 +14,86 @@ def main():
     parser.add_argument("--test", action="store_true", help="Generate test CSV files and run analysis.")
     parser.add_argument("--rows", type=int, default=10000, help="Approximate rows for test files.")
     parser.add_argument("--files", type=int, default=1, help="Number of multi-project test files.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for test files; the same seed reproduces the same data.")
+    parser.add_argument("--test-format", choices=["csv", "parquet"], default="csv", help="File format of generated test files.")
+    parser.add_argument("--test-projects", type=int, default=2, help="Distinct projects per multi-project test file.")
+    parser.add_argument("--test-buckets", type=int, default=2, help="Buckets per project in multi-project test files.")
+    parser.add_argument("--test-content-types", type=int, default=2, help="Distinct content types in multi-project test files.")
+    parser.add_argument("--test-days", type=int, default=730, help="Span in days of object creation dates in test files.")
     parser.add_argument("--outdir", type=str, default="storage_pdf_report", help="Output directory.")
     parser.add_argument("--threads", type=int, default=max(1, os.cpu_count() or 1), help="CPU threads for DuckDB.")
     parser.add_argument("--memory-limit", type=str, help="Memory limit for DuckDB (e.g., '1GB').")
+    parser.add_argument("--db", type=str, help="Persistent DuckDB warehouse file; sources are ingested once and reused on later runs (files are then scanned in this process, not --workers).")
+    parser.add_argument("--temp-dir", type=str, help="Directory DuckDB spills to when a query outgrows --memory-limit (default: next to --db, or DuckDB's own).")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to generate test files and scan files in parallel; threads and memory limit are split between them.")
+    parser.add_argument("--chart-workers", type=int, default=1, help="Processes used to render charts for all sections in parallel.")
+    parser.add_argument("--pdf-workers", type=int, default=1, help="Processes that lay out PDF sections in parallel; the parts are merged into one report (needs pypdf).")
+    parser.add_argument("--chart-format", choices=["png", "svg"], help="Chart output format; 'svg' embeds charts as vector graphics (overrides CHART_FORMAT).")
+    parser.add_argument("--in-memory-charts", action="store_true", help="Keep rendered charts in memory buffers instead of writing files.")
+    parser.add_argument("--approximate", type=float, nargs="?", const=1.0, metavar="PERCENT", help="Draft report from a random sample of PERCENT%% of objects (default 1) with scaled-up estimates; marks the PDF as a draft.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk aggregate cache and rescan every file.")
+    parser.add_argument("--prune-cache", action="store_true", help="Drop cache entries (and --db source tables) for files that were deleted or changed.")
+    parser.add_argument("--no-chart-cache", action="store_true", help="Redraw every chart even if its data and style are unchanged.")
+    parser.add_argument("--cache-hash", action="store_true", help="Also key the aggregate cache on a content hash of each file.")
+    parser.add_argument("--drilldown", type=float, metavar="PERCENT", help="Add a drill-down section for every project holding at least PERCENT%% of all storage (overrides PROJECT_DRILLDOWN_MIN_PERCENT).")
+    parser.add_argument("--dedup", action="store_true", help="In the combined analysis, count each object once, keeping the row with the newest updated_time_utc, whether its rows are in one file or several.")
+    parser.add_argument("--previous", type=str, metavar="FILES", help="Comma-separated files of an earlier inventory snapshot; adds a Changes section with added, deleted and resized objects.")
+    parser.add_argument("--export", choices=EXPORT_FORMATS, help="Skip charts and the PDF; write each section's aggregates to <outdir>/export, one file per section.")
+    parser.add_argument("--profile", type=str, metavar="PATH", help="Write per-source and per-stage wall/CPU time, rows scanned, bytes read and peak RSS as JSON.")
+    parser.add_argument("--profile-explain", action="store_true", help="With --profile, also keep DuckDB's EXPLAIN ANALYZE tree for every profiled query.")
+    parser.add_argument("--serve", action="store_true", help="Run as a local report server that accepts jobs over HTTP instead of running one report.")
+    parser.add_argument("--port", type=int, default=8765, help="Port the report server listens on (localhost only).")
+    parser.add_argument("--max-jobs", type=int, default=2, help="Report jobs the server runs at once, each in its own warm worker process.")
     args = parser.parse_args()
 
     output_dir = Path(args.outdir)
 
+    if args.serve:
+        from storage_reporter.server import serve
+        serve(load_config(require_inputs=False), port=args.port, max_jobs=args.max_jobs)
+        return
+
     if args.test:
+        from storage_reporter.utils import create_test_files
+        from storage_reporter.testdata import TestDataSpec
+        try:
+            spec = TestDataSpec(seed=args.seed, file_format=args.test_format, projects=args.test_projects, buckets_per_project=args.test_buckets,
+                                content_types=args.test_content_types, date_span_days=args.test_days)
+        except ValueError as e:
+            parser.error(str(e))
         config = load_config()
         config.update({
-            "csv_files": create_test_files(output_dir / "test_data", args.files, args.rows),
+            "csv_files": create_test_files(output_dir / "test_data", args.files, args.rows, spec, workers=args.workers),
             "author": "Test Author",
             "version": "Test v0.1"
         })
     else:
         config = load_config()
         if not all(Path(f).exists() for f in config["csv_files"]):
-            print("❌ Error: One or more CSV files in .env do not exist.", file=sys.stderr)
+            print("❌ Error: One or more input files in .env do not exist.", file=sys.stderr)
             sys.exit(1)
 
-    # Initialize components
-    con = duckdb.connect(database=':memory:')
-    con.execute(f"SET threads = {args.threads};")
-    if args.memory_limit:
-        con.execute(f"SET memory_limit = '{args.memory_limit}';")
-
-    analyzer = DataAnalyzer(con)
-    chart_generator = ChartGenerator(config, output_dir / "charts")
-
-    print("\n--- Starting Storage PDF Report Generation ---")
-    start_time = time.time()
-
-    report_sections = []
-
-    # Analyze each file individually
-    num_sources = len(config["csv_files"])
-    has_combined_report = num_sources > 1
-    total_steps = num_sources + 1 if has_combined_report else num_sources
-
-    for i, fpath in enumerate(config["csv_files"]):
-        print(f"\n[{i+1}/{total_steps}] Analyzing individual file: {fpath}")
-        clean_stem = Path(fpath).stem.replace('-', ' ').replace('_', ' ')
-        title = f"Analysis for: {clean_stem}"
-
-        aggs = analyzer.analyze_source(fpath)
-
-        # --- DEFINITIVE FIX: Conditional Chart Generation ---
-        charts = {}
-        total_objects = aggs.get('summary', (0, 0))[0]
-        if total_objects > 0:
-            charts = chart_generator.generate_all_charts(aggs, Path(fpath).stem)
-        else:
-            print(f"  --> Skipping chart generation for '{fpath}' as it contains no objects.")
-
-        report_sections.append({'title': title, 'aggs': aggs, 'charts': charts})
-
-    # Analyze all files combined
-    if has_combined_report:
-        print(f"\n[{total_steps}/{total_steps}] Analyzing all files combined...")
-        title = "Combined Analysis of All Files"
-        aggs = analyzer.analyze_source(config["csv_files"])
-        charts = chart_generator.generate_all_charts(aggs, "combined")
-        report_sections.append({'title': title, 'aggs': aggs, 'charts': charts})
-
-    # Assemble the PDF
-    print("\nAssembling PDF document...")
-    pdf_generator = PDFReportGenerator(config, report_sections, output_dir)
-    pdf_generator.create_report()
-
-    elapsed = time.time() - start_time
-    print(f"\n--- Report Generation Complete in {elapsed:.2f} seconds ---")
-    print(f"✅ PDF Report saved to: {pdf_generator.get_final_path()}")
+    previous = [p.strip() for p in args.previous.split(',') if p.strip()] if args.previous else None
+    if previous and not all(Path(f).exists() for f in previous):
+        print("❌ Error: One or more --previous snapshot files do not exist.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.chart_format:
+        config["chart_format"] = args.chart_format
+    if args.in_memory_charts:
+        config["chart_in_memory"] = True
+    if args.drilldown is not None:
+        config["drilldown_min_percent"] = args.drilldown
+    try:
+        options = ReportOptions(
+            threads=args.threads, memory_limit=args.memory_limit, db=args.db, temp_dir=args.temp_dir, workers=args.workers,
+            chart_workers=args.chart_workers, pdf_workers=args.pdf_workers, approximate=args.approximate, no_cache=args.no_cache, prune_cache=args.prune_cache,
+            no_chart_cache=args.no_chart_cache, cache_hash=args.cache_hash, profile=args.profile, profile_explain=args.profile_explain,
+            dedup=args.dedup, previous=previous, export=args.export
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    run_report(config, output_dir, options)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
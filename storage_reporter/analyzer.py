@@ -1,44 +1,548 @@
+import math
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import multiprocessing
+from pathlib import Path
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from .profiling import Profiler, profile_stage
+
+_MEMORY_UNITS = {'': 1, 'b': 1, 'kb': 1000, 'mb': 1000**2, 'gb': 1000**3, 'tb': 1000**4, 'kib': 1024, 'mib': 1024**2, 'gib': 1024**3, 'tib': 1024**4}
+
+# The only inventory columns the analyzer reads; wide columns such as object_name are never decoded.
+INVENTORY_COLUMNS = ('project_id', 'bucket_name', 'size_bytes', 'content_type', 'creation_time_utc')
+# Per-object columns read only by the analyses that need to identify objects, such as snapshot diffs.
+IDENTITY_COLUMNS = {
+    'object_name': "CAST(object_name AS VARCHAR) as object_name",
+    'updated_time_utc': "TRY_CAST(updated_time_utc AS TIMESTAMP) as updated_ts",
+}
+COMPRESSION_SUFFIXES = ('.gz', '.zst')
+# Approximate runs keep a log-scale object size histogram with this many bins per power of two (each ~9% wide),
+# from which percentiles are read; unlike quantile sketches it merges across files like every other partial.
+SIZE_LOG_STEPS = 8
+# Two-sided 95% normal quantile used for the margins reported with sampled estimates.
+ESTIMATE_Z = 1.96
+# CSV readers keep rejected lines in DuckDB's reject_errors table so they can be counted; store_rejects cannot be
+# combined with union_by_name, so each CSV file gets its own reader. Every open reader holds its read buffer for the
+# whole query (32 MiB by default), so it is kept small enough for a thousand-file union; 4 MiB scans as fast.
+CSV_BUFFER_SIZE = 4 * 2**20
+READERS = {
+    'csv': "read_csv_auto({paths}, ignore_errors=true, store_rejects=true, buffer_size=%d)" % CSV_BUFFER_SIZE,
+    'typed_csv': "read_csv({paths}, columns={columns}, header={header}, delim={delimiter!r}, auto_detect=false{timestamp_format}, ignore_errors=true, store_rejects=true, buffer_size=%d)" % CSV_BUFFER_SIZE,
+    'parquet': "read_parquet({paths}, union_by_name=true)",
+    'ndjson': "read_ndjson({paths}, columns={columns}, ignore_errors=true)",
+}
+
+def source_format(path):
+    """Picks the reader for an input file from its extension, looking through .gz/.zst compression."""
+    name = str(path).lower()
+    for suffix in COMPRESSION_SUFFIXES:
+        name = name.removesuffix(suffix)
+    if name.endswith(('.parquet', '.pq')):
+        return 'parquet'
+    if name.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+def source_stem(path):
+    """File name without its format and compression extensions, e.g. 'inv.csv.gz' -> 'inv'."""
+    name = Path(path).name
+    for suffix in COMPRESSION_SUFFIXES:
+        name = name.removesuffix(suffix)
+    return Path(name).stem
+
+def source_label(paths):
+    """Names a scanned source in profile records: the file itself, or how many files were read together."""
+    return paths[0] if len(paths) == 1 else f"{len(paths)} files"
+
+def create_connection(threads, memory_limit=None, database=':memory:', temp_directory=None):
+    return configure_connection(duckdb.connect(database=database), threads, memory_limit, temp_directory)
+
+def configure_connection(con, threads, memory_limit=None, temp_directory=None):
+    """Applies a run's settings to `con`. Unset limits are reset to DuckDB's defaults, so a connection that is reused
+    across runs never keeps an earlier run's limits."""
+    con.execute(f"SET threads = {threads};")
+    if memory_limit:
+        con.execute(f"SET memory_limit = '{memory_limit}';")
+    else:
+        con.execute("RESET memory_limit;")
+    if temp_directory:
+        # Where DuckDB spills hash tables and sorts that outgrow memory_limit.
+        con.execute(f"SET temp_directory = '{temp_directory}';")
+    else:
+        con.execute("RESET temp_directory;")
+    return con
+
+def split_memory_limit(memory_limit, parts):
+    """Divides a DuckDB memory limit such as '8GB' or '512MiB' evenly between `parts` connections."""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([a-zA-Z]*)\s*", memory_limit)
+    if not match or match.group(2).lower() not in _MEMORY_UNITS:
+        raise ValueError(f"Unrecognised memory limit: {memory_limit!r}")
+    total_bytes = float(match.group(1)) * _MEMORY_UNITS[match.group(2).lower()]
+    return f"{max(1, int(total_bytes / parts / 1000**2))}MB"
+
+def last_reject_scan(con):
+    # reject_errors accumulates over the connection's lifetime; scans are told apart by their increasing scan_id.
+    try:
+        return con.execute("SELECT COALESCE(MAX(scan_id), -1) FROM reject_errors").fetchone()[0]
+    except duckdb.CatalogException:
+        return -1
+
+def rejected_rows_since(con, scan_id):
+    """Counts the CSV lines rejected by scans newer than `scan_id`."""
+    try:
+        # A line can fail on several columns, so count lines rather than errors.
+        return con.execute(
+            "SELECT COUNT(*) FROM (SELECT DISTINCT scan_id, file_id, line FROM reject_errors WHERE scan_id > ?)", [scan_id]
+        ).fetchone()[0]
+    except duckdb.CatalogException:
+        return 0
+
+def histogram_quantile(histogram, percent):
+    """Reads a percentile off (log2 bin, object count) pairs sorted by bin; the None bin holds empty objects."""
+    total = sum(count for _, count in histogram)
+    if not total:
+        return None
+    target, running = percent / 100 * total, 0
+    for size_bin, count in histogram:
+        running += count
+        if running >= target:
+            return 0.0 if size_bin is None else 2 ** ((size_bin + 0.5) / SIZE_LOG_STEPS)
+
+def fetch_arrow_table(con):
+    """The connection's pending result as a pyarrow Table, handed over by DuckDB without copying the column data.
+    Newer DuckDB releases renamed fetch_arrow_table() to to_arrow_table()."""
+    return con.to_arrow_table() if hasattr(con, 'to_arrow_table') else con.fetch_arrow_table()
+
+def _scan_partials_in_worker(source_path, threads, memory_limit, inventory_schema, sample_percent, drilldown_min_percent, profile_explain):
+    # profile_explain is None when the run is not being profiled; profiled stages travel back with the partials.
+    con = create_connection(threads, memory_limit)
+    profiler = None if profile_explain is None else Profiler(explain=profile_explain)
+    if profiler:
+        profiler.watch(con)
+    try:
+        partials = DataAnalyzer(con, inventory_schema=inventory_schema, sample_percent=sample_percent, profiler=profiler,
+                                drilldown_min_percent=drilldown_min_percent)._scan_partials(source_path)
+        return partials, profiler.stages if profiler else []
+    finally:
+        con.close()
+
 class DataAnalyzer:
-    def __init__(self, con):
+    # GROUPING(project_id, bucket_name, created_month, created_year, size_category) -> dimension name. The project_*
+    # dimensions break a project down further for its drill-down and carry the project in the partials' project column.
+    GROUPING_DIMENSIONS = {15: 'project', 23: 'bucket', 27: 'month', 29: 'year', 30: 'size_band', 31: 'total',
+                           7: 'project_bucket', 11: 'project_month', 14: 'project_size_band'}
+    # Rows per project in a drill-down's Top 10 Buckets table and chart.
+    DRILLDOWN_TOP_N = 10
+
+    def __init__(self, con, cache=None, inventory_schema=None, warehouse=None, sample_percent=None, profiler=None, dedup=False,
+                 drilldown_min_percent=None, drilldown_max_projects=None, arrow=False):
         self.con = con
+        self.cache = cache
+        # Declared CSV layout from config (see config.parse_inventory_schema); None falls back to sniffing each file.
+        self.inventory_schema = inventory_schema
+        # When set, sources are scanned from their ingested warehouse tables instead of being re-read from disk.
+        self.warehouse = warehouse
+        # Percentage of rows to Bernoulli-sample; sums and counts are scaled back up and reported with margins.
+        self.sample_percent = sample_percent
+        # Optional profiling.Profiler; the connection must already be watched by it.
+        self.profiler = profiler
+        # Count objects listed several times, within a file or across files, once in the combined analysis, keeping
+        # their newest row.
+        self.dedup = dedup
+        # Projects holding at least this percentage of the storage get a drill-down, the largest `drilldown_max_projects`
+        # of them at most; None turns drill-downs off, and with them the per-project grouping sets of every scan.
+        self.drilldown_min_percent = drilldown_min_percent
+        self.drilldown_max_projects = drilldown_max_projects
+        # Return the aggs' tables as pyarrow Tables instead of pandas DataFrames; the partials are Arrow either way.
+        self.arrow = arrow
+        self.partials = {}
 
-    def analyze_source(self, source_path_or_paths):
-        source_sql_str = f"[{', '.join([f'{p!r}' for p in source_path_or_paths])}]" if isinstance(source_path_or_paths, list) else f"{source_path_or_paths!r}"
-        return self._perform_aggregations(source_sql_str)
+    def analyze_source(self, source_path_or_paths, drilldowns=False):
+        """Returns the report `aggs` of one source; with `drilldowns`, they include the per-project drill-downs too."""
+        if isinstance(source_path_or_paths, list):
+            return self._derive_aggregations(self._scan_partials(source_path_or_paths), source_label(source_path_or_paths), drilldowns)
+        if source_path_or_paths in self.partials:
+            return self._derive_aggregations(self.partials[source_path_or_paths], source_path_or_paths, drilldowns)
+        fingerprint, partials = self.cache.lookup(source_path_or_paths) if self.cache else (None, None)
+        if partials is None:
+            partials = self._scan_partials(source_path_or_paths)
+            if self.cache:
+                self.cache.store(fingerprint, partials)
+        self.partials[source_path_or_paths] = partials
+        return self._derive_aggregations(partials, source_path_or_paths, drilldowns)
 
-    def _perform_aggregations(self, source_sql_str):
-        cte = f"""
+    def prefetch_sources(self, source_paths, workers, threads, memory_limit=None):
+        """Scans files across a process pool, each worker with its own connection and share of threads/memory."""
+        pending = {}
+        for path in dict.fromkeys(source_paths):
+            if path in self.partials:
+                continue
+            fingerprint, partials = self.cache.lookup(path) if self.cache else (None, None)
+            if partials is None:
+                pending[path] = fingerprint
+            else:
+                self.partials[path] = partials
+        if not pending:
+            return
+        workers = min(workers, len(pending))
+        worker_memory = split_memory_limit(memory_limit, workers) if memory_limit else None
+        # 'spawn' avoids forking while the parent's DuckDB connection holds threads and locks.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            profile_explain = self.profiler.explain if self.profiler else None
+            results = pool.map(_scan_partials_in_worker, pending, repeat(max(1, threads // workers)), repeat(worker_memory),
+                               repeat(self.inventory_schema), repeat(self.sample_percent), repeat(self.drilldown_min_percent), repeat(profile_explain))
+            for (path, fingerprint), (partials, stages) in zip(pending.items(), results):
+                self.partials[path] = partials
+                if self.profiler:
+                    self.profiler.stages.extend(dict(stage, worker=True) for stage in stages)
+                if self.cache:
+                    self.cache.store(fingerprint, partials)
+
+    def analyze_combined(self, source_paths, drilldowns=False):
+        """Aggregates several sources by merging their per-file partials; only unseen files are scanned.
+
+        With dedup, merging per-file sums would count overlapping objects twice, so the files are instead scanned
+        together in one deduplicating pass.
+        """
+        source = f"combined ({len(source_paths)} files)"
+        if self.dedup:
+            return self._derive_aggregations(self._scan_partials(source_paths, dedup=True), source, drilldowns)
+        for path in source_paths:
+            if path not in self.partials:
+                self.analyze_source(path)
+        with profile_stage(self.profiler, 'merge', source=source):
+            merged = self.merge_partials([self.partials[p] for p in source_paths])
+        return self._derive_aggregations(merged, source, drilldowns)
+
+    def merge_partials(self, partials_list):
+        """Re-aggregates any number of long-form partials into one; the Arrow tables are concatenated without copying
+        and summed in DuckDB, so exact byte totals stay exact."""
+        partials_union = pa.concat_tables(partials_list)
+        size_squares = ", SUM(size_squares) as size_squares" if 'size_squares' in partials_union.column_names else ""
+        self.con.register('partials_union', partials_union)
+        try:
+            self.con.execute(f"""
+                SELECT dimension, project, key, period, SUM(total_size) as total_size, SUM(object_count)::BIGINT as object_count{size_squares}
+                FROM partials_union GROUP BY dimension, project, key, period
+            """)
+            return fetch_arrow_table(self.con)
+        finally:
+            self.con.unregister('partials_union')
+
+    def _scan_partials(self, source_path_or_paths, dedup=False):
+        """Parses the source once and returns every sum/count the report needs in long form as a pyarrow Table, whose
+        exact byte sums arrive as 38-digit decimals where pandas would round them to doubles, plus a 'rejected' row
+        counting the malformed CSV lines that ignore_errors skipped and, with dedup, a 'duplicates' row counting the
+        rows that were dropped as older copies of an object.
+
+        With drill-downs on, the per-project breakdowns are grouping sets of the same pass, so they cost no extra scan."""
+        dimensions = self.GROUPING_DIMENSIONS
+        grouping_columns = "project_id, bucket_name, created_month, created_year, size_category"
+        grouping_sets = "(), (project_id), (bucket_name), (created_month), (created_year), (size_category)"
+        if self.drilldown_min_percent is not None:
+            grouping_sets += ", (project_id, bucket_name), (project_id, created_month), (project_id, size_category)"
+        # True on the project_* grouping sets, which key a breakdown of one project.
+        project_scoped = "GROUPING(project_id) = 0 AND GROUPING(bucket_name, created_month, size_category) <> 7"
+        key_columns = "project_id, bucket_name, size_category"
+        size_log, sample, measures = "", "", "SUM(size_bytes) as total_size, COUNT(*) as object_count"
+        if self.sample_percent:
+            # The size histogram adds a sixth grouping column, which shifts every GROUPING() id left by one bit.
+            dimensions = {gid << 1 | 1: name for gid, name in dimensions.items()} | {62: 'size_log'}
+            grouping_columns += ", size_log"
+            key_columns += ", size_log"
+            grouping_sets += ", (size_log)"
+            size_log = f",\n                    CASE WHEN size_bytes > 0 THEN CAST(FLOOR(LOG2(size_bytes) * {SIZE_LOG_STEPS}) AS VARCHAR) END as size_log"
+            sample = f" USING SAMPLE {self.sample_percent} PERCENT (bernoulli)"
+            scale = 100 / self.sample_percent
+            # size_squares stays unscaled: it feeds the Horvitz-Thompson variance of the scaled total.
+            measures = f"SUM(size_bytes) * {scale} as total_size, ROUND(COUNT(*) * {scale})::BIGINT as object_count, SUM(size_bytes::DOUBLE * size_bytes) as size_squares"
+        copies = ""
+        if dedup:
+            copies = ",\n                    copies"
+            duplicates = f"ROUND(SUM(copies - 1) * {100 / self.sample_percent})" if self.sample_percent else "SUM(copies - 1)"
+            measures += f", {duplicates}::BIGINT as duplicates"
+        dimension_case = " ".join(f"WHEN {gid} THEN '{name}'" for gid, name in dimensions.items())
+        paths = source_path_or_paths if isinstance(source_path_or_paths, list) else [source_path_or_paths]
+        # Warehouse tables do not keep object names, so a deduplicating scan reads the files themselves.
+        use_warehouse = self.warehouse and not dedup
+        if use_warehouse:
+            tables = [self.warehouse.table_for(path, self._source_select_sql(path)) for path in paths]
+            source_sql = "\nUNION ALL\n".join(f"SELECT * FROM {table}" for table, _ in tables)
+        elif dedup:
+            source_sql = self._deduplicated_select_sql(paths)
+        else:
+            source_sql = self._source_select_sql(source_path_or_paths)
+        query = f"""
             WITH source_data AS (
+                {source_sql}
+            ),
+            banded AS (
                 SELECT
                     project_id,
                     bucket_name,
-                    TRY_CAST(size_bytes AS UBIGINT) as size_bytes,
-                    COALESCE(NULLIF(TRIM(content_type), ''), 'unknown') as content_type,
-                    TRY_CAST(creation_time_utc AS TIMESTAMP) as created_ts
-                FROM read_csv_auto({source_sql_str}, ignore_errors=true, union_by_name=true)
+                    size_bytes,
+                    date_trunc('month', created_ts) as created_month,
+                    date_trunc('year', created_ts) as created_year,
+                    CASE
+                        WHEN size_bytes IS NULL OR size_bytes = 0 THEN '0 B'
+                        WHEN size_bytes < 1024 THEN '< 1 KB'
+                        WHEN size_bytes < 1024*1024 THEN '1 KB - 1 MB'
+                        WHEN size_bytes < 1024*1024*1024 THEN '1 MB - 1 GB'
+                        WHEN size_bytes < 1024*1024*1024*1024::BIGINT THEN '1 GB - 1 TB'
+                        ELSE '> 1 TB'
+                    END as size_category{size_log}{copies}
+                FROM source_data{sample}
+            )
+            SELECT
+                CASE GROUPING({grouping_columns}) {dimension_case} END as dimension,
+                CASE WHEN {project_scoped} THEN project_id END as project,
+                CASE WHEN {project_scoped} THEN COALESCE(bucket_name, size_category) ELSE COALESCE({key_columns}) END as key,
+                COALESCE(created_month, created_year) as period,
+                {measures}
+            FROM banded
+            GROUP BY GROUPING SETS ({grouping_sets})
+        """
+        watermark = last_reject_scan(self.con)
+        with profile_stage(self.profiler, 'scan', source=source_label(paths)) as record:
+            self.con.execute(query)
+            partials = fetch_arrow_table(self.con)
+            if self.profiler:
+                self.profiler.add_query_metrics(record, self.con)
+        counts = {'rejected': sum(rejected for _, rejected in tables) if use_warehouse else rejected_rows_since(self.con, watermark)}
+        if dedup:
+            totals = partials.filter(pc.equal(partials['dimension'], 'total'))
+            counts['duplicates'] = pc.sum(totals['duplicates']).as_py() or 0
+            partials = partials.select([name for name in partials.column_names if name != 'duplicates'])
+        # The count rows carry no key, and zero for every measure but object_count.
+        extra = {'dimension': list(counts), 'object_count': list(counts.values())}
+        nulls = ('project', 'key', 'period')
+        extra = pa.table({field.name: pa.array(extra.get(field.name, [None if field.name in nulls else 0] * len(counts)), field.type)
+                          for field in partials.schema})
+        return pa.concat_tables([partials, extra])
+
+    def _deduplicated_select_sql(self, paths):
+        """Selects one row per (project_id, bucket_name, object_name) across all `paths`, the one with the newest
+        updated_time_utc, with a `copies` column counting the rows it stands for. Rows without an object name cannot be
+        matched and are all kept. The window is hash-partitioned on the key and spills to temp_directory."""
+        rows = self._source_select_sql(paths, ('object_name', 'updated_time_utc'))
+        return f"""
+                SELECT project_id, bucket_name, size_bytes, content_type, created_ts,
+                    CASE WHEN object_name IS NULL THEN 1 ELSE COUNT(*) OVER object_rows END as copies
+                FROM ({rows})
+                WINDOW object_rows AS (PARTITION BY project_id, bucket_name, object_name)
+                QUALIFY object_name IS NULL OR row_number() OVER (object_rows ORDER BY updated_ts DESC NULLS LAST) = 1"""
+
+    def analyze_changes(self, previous_paths, current_paths):
+        """Diffs two inventory snapshots on (project_id, bucket_name, object_name) and returns the Changes section's aggs.
+
+        Rows sharing a key within one snapshot (object versions, overlapping files) are summed first so each key is
+        compared once. The per-key aggregation and the full outer hash join both spill to the connection's
+        temp_directory, so snapshots may be larger than memory.
+        """
+        identity = ('object_name',)
+        per_key = "SELECT project_id, bucket_name, object_name, SUM(size_bytes) as size_bytes FROM ({}) WHERE object_name IS NOT NULL GROUP BY ALL"
+        query = f"""
+            WITH previous AS (
+                {per_key.format(self._source_select_sql(previous_paths, identity))}
+            ),
+            current AS (
+                {per_key.format(self._source_select_sql(current_paths, identity))}
+            ),
+            changed AS (
+                SELECT
+                    COALESCE(c.project_id, p.project_id) as project_id,
+                    COALESCE(c.bucket_name, p.bucket_name) as bucket_name,
+                    CASE WHEN p.object_name IS NULL THEN 'added' WHEN c.object_name IS NULL THEN 'deleted' ELSE 'resized' END as change,
+                    COALESCE(c.size_bytes, 0) - COALESCE(p.size_bytes, 0) as size_delta
+                FROM previous p
+                FULL OUTER JOIN current c
+                    ON p.object_name = c.object_name AND p.bucket_name IS NOT DISTINCT FROM c.bucket_name
+                    AND p.project_id IS NOT DISTINCT FROM c.project_id
+                WHERE p.object_name IS NULL OR c.object_name IS NULL OR p.size_bytes IS DISTINCT FROM c.size_bytes
             )
+            SELECT
+                CASE GROUPING(project_id, bucket_name) WHEN 1 THEN 'project' WHEN 2 THEN 'bucket' ELSE 'total' END as dimension,
+                COALESCE(project_id, bucket_name) as key,
+                change,
+                COUNT(*) as object_count,
+                SUM(size_delta) as size_delta
+            FROM changed
+            GROUP BY GROUPING SETS ((change), (project_id, change), (bucket_name, change))
         """
+        with profile_stage(self.profiler, 'diff', source=f"{len(previous_paths)} -> {len(current_paths)} files") as record:
+            self.con.execute(query)
+            changes = fetch_arrow_table(self.con)
+            if self.profiler:
+                self.profiler.add_query_metrics(record, self.con)
+        return self._derive_changes(changes)
+
+    def _derive_changes(self, changes):
+        delta_columns = """
+            COALESCE(SUM(object_count) FILTER (WHERE change = 'added'), 0)::BIGINT as added,
+            COALESCE(SUM(object_count) FILTER (WHERE change = 'deleted'), 0)::BIGINT as deleted,
+            COALESCE(SUM(object_count) FILTER (WHERE change = 'resized'), 0)::BIGINT as resized,
+            SUM(size_delta)::DOUBLE as net_size_delta"""
         queries = {
-            'summary': f"{cte} SELECT COUNT(*), SUM(size_bytes) FROM source_data",
-            'top_projects': f"{cte} SELECT project_id, SUM(size_bytes) as total_size FROM source_data WHERE project_id IS NOT NULL GROUP BY 1 ORDER BY 2 DESC LIMIT 10",
-            'top_buckets': f"{cte} SELECT bucket_name, SUM(size_bytes) as total_size FROM source_data WHERE bucket_name IS NOT NULL GROUP BY 1 ORDER BY 2 DESC LIMIT 10",
-            'distribution_by_project': f"{cte} SELECT project_id, SUM(size_bytes) as total_size FROM source_data WHERE project_id IS NOT NULL GROUP BY 1 ORDER BY 2 DESC",
-            'monthly_growth': f"{cte} SELECT date_trunc('month', created_ts) as month, SUM(size_bytes) as monthly_size FROM source_data WHERE created_ts IS NOT NULL GROUP BY 1 ORDER BY 1",
-            'yearly_growth': f"{cte} SELECT date_trunc('year', created_ts) as year, SUM(size_bytes) as yearly_size FROM source_data WHERE created_ts IS NOT NULL GROUP BY 1 ORDER BY 1",
-
-            'size_distribution': f"""{cte}
-                SELECT CASE
-                    WHEN size_bytes IS NULL OR size_bytes = 0 THEN '0 B'
-                    WHEN size_bytes < 1024 THEN '< 1 KB'
-                    WHEN size_bytes < 1024*1024 THEN '1 KB - 1 MB'
-                    WHEN size_bytes < 1024*1024*1024 THEN '1 MB - 1 GB'
-                    WHEN size_bytes < 1024*1024*1024*1024::BIGINT THEN '1 GB - 1 TB'
-                    ELSE '> 1 TB'
-                END as size_category, COUNT(*) as object_count
-                FROM source_data GROUP BY 1
-            """
+            'change_summary': "SELECT t.change, COALESCE(c.object_count, 0)::BIGINT as object_count, COALESCE(c.size_delta, 0)::DOUBLE as size_delta FROM (VALUES ('added', 1), ('deleted', 2), ('resized', 3)) t(change, position) LEFT JOIN changes c ON c.change = t.change AND c.dimension = 'total' ORDER BY t.position",
+            'project_changes': f"SELECT CAST(key AS VARCHAR) as project_id, {delta_columns} FROM changes WHERE dimension = 'project' GROUP BY 1 ORDER BY ABS(net_size_delta) DESC, 1 LIMIT 10",
+            'bucket_changes': f"SELECT CAST(key AS VARCHAR) as bucket_name, {delta_columns} FROM changes WHERE dimension = 'bucket' GROUP BY 1 ORDER BY ABS(net_size_delta) DESC, 1 LIMIT 10",
+        }
+        self.con.register('changes', changes)
+        try:
+            return {name: self._fetch_table(query) for name, query in queries.items()}
+        finally:
+            self.con.unregister('changes')
+
+    def _source_select_sql(self, source_path_or_paths, identity_columns=()):
+        """Selects the typed inventory columns, one reader per input format (per file for CSV), unioned together.
+        `identity_columns` adds entries of IDENTITY_COLUMNS for analyses that need to tell objects apart."""
+        paths = source_path_or_paths if isinstance(source_path_or_paths, list) else [source_path_or_paths]
+        extra = "".join(f",\n                    {IDENTITY_COLUMNS[c]}" for c in identity_columns)
+        groups = {}
+        for path in paths:
+            fmt = source_format(path)
+            groups.setdefault((fmt, path if fmt == 'csv' else None), []).append(path)
+        return "\nUNION ALL\n".join(f"""
+                SELECT
+                    CAST(project_id AS VARCHAR) as project_id,
+                    CAST(bucket_name AS VARCHAR) as bucket_name,
+                    TRY_CAST(size_bytes AS UBIGINT) as size_bytes,
+                    COALESCE(NULLIF(TRIM(CAST(content_type AS VARCHAR)), ''), 'unknown') as content_type,
+                    TRY_CAST(creation_time_utc AS TIMESTAMP) as created_ts{extra}
+                FROM {self._reader_sql(fmt, group, identity_columns)}""" for (fmt, _), group in groups.items())
+
+    def _reader_sql(self, fmt, paths, identity_columns=()):
+        path_list = f"[{', '.join([f'{p!r}' for p in paths])}]"
+        if fmt == 'ndjson':
+            # JSON readers only decode the listed keys, so identity columns have to be asked for explicitly.
+            columns = "{" + ", ".join(f"'{c}': 'VARCHAR'" for c in (*INVENTORY_COLUMNS, *identity_columns)) + "}"
+            return READERS[fmt].format(paths=path_list, columns=columns)
+        if fmt != 'csv' or not self.inventory_schema:
+            return READERS[fmt].format(paths=path_list)
+        # With declared types the TRY_CASTs above are no-ops and DuckDB parses each value exactly once.
+        schema = self.inventory_schema
+        timestamp_format = f", timestampformat={schema['timestamp_format']!r}" if schema['timestamp_format'] else ""
+        columns = "{" + ", ".join(f"'{name}': '{sql_type}'" for name, sql_type in schema['columns'].items()) + "}"
+        return READERS['typed_csv'].format(
+            paths=path_list, columns=columns, header=str(schema['header']).lower(), delimiter=schema['delimiter'], timestamp_format=timestamp_format
+        )
+
+    def _derive_aggregations(self, partials, source, drilldowns=False):
+        """Builds the report `aggs` dict from long-form partials (one file's or several merged); with `drilldowns` and
+        drilldown_min_percent set, 'project_drilldowns' holds one aggs dict per drilled-down project. `source` labels
+        the profile records of the queries."""
+        queries = {
+            'summary': "SELECT COALESCE(SUM(object_count), 0)::BIGINT, SUM(total_size)::HUGEINT FROM partials WHERE dimension = 'total'",
+            'top_projects': "SELECT CAST(key AS VARCHAR) as project_id, SUM(total_size)::DOUBLE as total_size FROM partials WHERE dimension = 'project' AND key IS NOT NULL GROUP BY 1 ORDER BY 2 DESC LIMIT 10",
+            'top_buckets': "SELECT CAST(key AS VARCHAR) as bucket_name, SUM(total_size)::DOUBLE as total_size FROM partials WHERE dimension = 'bucket' AND key IS NOT NULL GROUP BY 1 ORDER BY 2 DESC LIMIT 10",
+            'distribution_by_project': "SELECT CAST(key AS VARCHAR) as project_id, SUM(total_size)::DOUBLE as total_size FROM partials WHERE dimension = 'project' AND key IS NOT NULL GROUP BY 1 ORDER BY 2 DESC",
+            'project_listing': "SELECT CAST(key AS VARCHAR) as project_id, SUM(object_count)::BIGINT as object_count, SUM(total_size)::DOUBLE as total_size FROM partials WHERE dimension = 'project' AND key IS NOT NULL GROUP BY 1 ORDER BY 3 DESC, 1",
+            'bucket_listing': "SELECT CAST(key AS VARCHAR) as bucket_name, SUM(object_count)::BIGINT as object_count, SUM(total_size)::DOUBLE as total_size FROM partials WHERE dimension = 'bucket' AND key IS NOT NULL GROUP BY 1 ORDER BY 3 DESC, 1",
+            'monthly_growth': "SELECT CAST(period AS TIMESTAMP) as month, SUM(total_size)::DOUBLE as monthly_size FROM partials WHERE dimension = 'month' AND period IS NOT NULL GROUP BY 1 ORDER BY 1",
+            'yearly_growth': "SELECT CAST(period AS TIMESTAMP) as year, SUM(total_size)::DOUBLE as yearly_size FROM partials WHERE dimension = 'year' AND period IS NOT NULL GROUP BY 1 ORDER BY 1",
+            'size_distribution': "SELECT CAST(key AS VARCHAR) as size_category, SUM(object_count)::BIGINT as object_count FROM partials WHERE dimension = 'size_band' GROUP BY 1",
+            'rejected_rows': "SELECT COALESCE(SUM(object_count), 0)::BIGINT FROM partials WHERE dimension = 'rejected'",
+            # NULL unless the partials come from a deduplicating scan.
+            'duplicates_removed': "SELECT SUM(object_count)::BIGINT FROM partials WHERE dimension = 'duplicates'",
+        }
+        self.con.register('partials', partials)
+        try:
+            results = {}
+            for name, query in queries.items():
+                with profile_stage(self.profiler, 'aggregate', source=source, name=name) as record:
+                    if name == 'summary':
+                        results[name] = self.con.execute(query).fetchone()
+                    elif name in ('rejected_rows', 'duplicates_removed'):
+                        results[name] = self.con.execute(query).fetchone()[0]
+                    else:
+                        results[name] = self._fetch_table(query)
+                    if self.profiler:
+                        self.profiler.add_query_metrics(record, self.con)
+            results['estimate'] = self._derive_estimate() if self.sample_percent else None
+            if drilldowns and self.drilldown_min_percent is not None:
+                results['project_drilldowns'] = self._derive_project_drilldowns(source)
+        finally:
+            self.con.unregister('partials')
+        return results
+
+    def _derive_project_drilldowns(self, source):
+        """Per-project aggs for the projects above the drill-down threshold, read from the registered 'partials' view.
+
+        Each breakdown is one query over all drilled-down projects at once, partitioned by project: the top buckets are
+        ranked with a window per project, size bands and months are grouped per project. Years are rolled up from the
+        months, which nest in them exactly. The dicts have the inventory aggs' shape, minus the project-level views.
+        """
+        limit = f"LIMIT {int(self.drilldown_max_projects)}" if self.drilldown_max_projects else ""
+        scoped = "FROM partials WHERE dimension = '{}' AND project IN (SELECT project_id FROM drilled_projects)"
+        queries = {
+            'top_buckets': f"SELECT project, CAST(key AS VARCHAR) as bucket_name, SUM(total_size)::DOUBLE as total_size {scoped.format('project_bucket')} AND key IS NOT NULL GROUP BY 1, 2 QUALIFY row_number() OVER (PARTITION BY project ORDER BY SUM(total_size) DESC, bucket_name) <= {self.DRILLDOWN_TOP_N} ORDER BY project, total_size DESC, bucket_name",
+            'size_distribution': f"SELECT project, CAST(key AS VARCHAR) as size_category, SUM(object_count)::BIGINT as object_count {scoped.format('project_size_band')} GROUP BY ALL ORDER BY project",
+            'monthly_growth': f"SELECT project, CAST(period AS TIMESTAMP) as month, SUM(total_size)::DOUBLE as monthly_size {scoped.format('project_month')} AND period IS NOT NULL GROUP BY ALL ORDER BY project, month",
+            'yearly_growth': f"SELECT project, CAST(date_trunc('year', period) AS TIMESTAMP) as year, SUM(total_size)::DOUBLE as yearly_size {scoped.format('project_month')} AND period IS NOT NULL GROUP BY ALL ORDER BY project, year",
+        }
+        with profile_stage(self.profiler, 'aggregate', source=source, name='project_drilldowns') as record:
+            self.con.execute(f"""
+                CREATE OR REPLACE TEMP TABLE drilled_projects AS
+                SELECT CAST(key AS VARCHAR) as project_id, SUM(object_count)::BIGINT as object_count, SUM(total_size)::HUGEINT as total_size,
+                    SUM(total_size) * 100.0 / NULLIF(SUM(SUM(total_size)) OVER (), 0) as share
+                FROM partials WHERE dimension = 'project' AND key IS NOT NULL
+                GROUP BY 1 QUALIFY share >= {float(self.drilldown_min_percent)} ORDER BY total_size DESC, 1 {limit}
+            """)
+            try:
+                projects = self.con.execute("SELECT project_id, object_count, total_size, share FROM drilled_projects ORDER BY total_size DESC, project_id").fetchall()
+                breakdowns = {}
+                for name, query in queries.items():
+                    frame = self._fetch_table(query)
+                    # Rows come ordered by project, so each project's rows are one slice; pandas' groupby would pay its
+                    # per-group overhead thousands of times. Arrow slices are views of the fetched table.
+                    if self.arrow:
+                        owners = frame.column('project').to_numpy()
+                        frame = frame.select([name for name in frame.column_names if name != 'project'])
+                    else:
+                        owners = frame.pop('project').to_numpy()
+                    starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]]) if len(owners) else np.array([], dtype=np.int64)
+                    ends = np.r_[starts[1:], len(owners)]
+                    per_project = {owners[start]: self._slice_rows(frame, start, end) for start, end in zip(starts.tolist(), ends.tolist())}
+                    breakdowns[name] = (per_project, self._slice_rows(frame, 0, 0))
+            finally:
+                self.con.execute("DROP TABLE IF EXISTS drilled_projects")
+            record['projects'] = len(projects)
+        return [
+            {'project': project, 'share': share, 'summary': (object_count, total_size),
+             **{name: per_project.get(project, empty) for name, (per_project, empty) in breakdowns.items()}}
+            for project, object_count, total_size, share in projects
+        ]
+
+    def _fetch_table(self, query):
+        """Runs `query` and returns its result as a pandas DataFrame or, with `arrow`, a pyarrow Table."""
+        self.con.execute(query)
+        return fetch_arrow_table(self.con) if self.arrow else self.con.df()
+
+    def _slice_rows(self, table, start, end):
+        return table.slice(start, end - start) if self.arrow else table.iloc[start:end].reset_index(drop=True)
+
+    def _derive_estimate(self):
+        """Margins and distribution figures for a sampled run, read from the registered 'partials' view."""
+        fraction = self.sample_percent / 100
+        objects, size_squares = self.con.execute(
+            "SELECT COALESCE(SUM(object_count), 0), COALESCE(SUM(size_squares), 0) FROM partials WHERE dimension = 'total'"
+        ).fetchone()
+        distinct_projects, distinct_buckets = self.con.execute(
+            "SELECT COUNT(DISTINCT key) FILTER (WHERE dimension = 'project'), COUNT(DISTINCT key) FILTER (WHERE dimension = 'bucket') FROM partials"
+        ).fetchone()
+        histogram = self.con.execute(
+            "SELECT TRY_CAST(key AS INTEGER) as size_bin, SUM(object_count)::DOUBLE FROM partials WHERE dimension = 'size_log' GROUP BY 1 ORDER BY 1 NULLS FIRST"
+        ).fetchall()
+        # Bernoulli sampling: Var(N_hat) = (1-f)/f * N_hat and Var(S_hat) = (1-f)/f^2 * sum of sampled sizes squared.
+        return {
+            'sample_percent': self.sample_percent,
+            'objects_margin': ESTIMATE_Z * math.sqrt((1 - fraction) / fraction * objects),
+            'size_margin': ESTIMATE_Z * math.sqrt((1 - fraction) / fraction**2 * size_squares),
+            'distinct_projects': distinct_projects,
+            'distinct_buckets': distinct_buckets,
+            'size_percentiles': {p: histogram_quantile(histogram, p) for p in (50, 95, 99)},
         }
-        results = {}
-        for name, query in queries.items():
-            results[name] = self.con.execute(query).fetchone() if name == 'summary' else self.con.execute(query).df()
-        return results
\ No newline at end of file
@@ -0,0 +1,112 @@
+import hashlib
+import os
+from pathlib import Path
+from storage_reporter.analyzer import fetch_arrow_table
+
+class AggregateCache:
+    """Persists per-file partial aggregates in a DuckDB file, keyed by path, size, mtime, reader options and optionally
+    a content hash."""
+    # Bump whenever DataAnalyzer._scan_partials changes what it produces, so old entries are never served.
+    FORMAT_VERSION = 4
+
+    def __init__(self, con, cache_path, use_content_hash=False, options_key=""):
+        self.con = con
+        self.cache_path = Path(cache_path)
+        self.use_content_hash = use_content_hash
+        # Identifies how files are parsed (e.g. the declared inventory schema); entries made with other options miss.
+        self.options_key = options_key
+        self.hits = 0
+        self.misses = 0
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.con.execute(f"ATTACH {str(self.cache_path)!r} AS agg_cache")
+        self.con.execute("CREATE TABLE IF NOT EXISTS agg_cache.cache_meta (format_version INTEGER)")
+        stored_version = self.con.execute("SELECT MAX(format_version) FROM agg_cache.cache_meta").fetchone()[0]
+        if stored_version != self.FORMAT_VERSION:
+            # Older cache files may have a different table layout, so start them over.
+            self.con.execute("DROP TABLE IF EXISTS agg_cache.entries")
+            self.con.execute("DROP TABLE IF EXISTS agg_cache.partials")
+            self.con.execute("DELETE FROM agg_cache.cache_meta")
+            self.con.execute("INSERT INTO agg_cache.cache_meta VALUES (?)", [self.FORMAT_VERSION])
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS agg_cache.entries (
+                path VARCHAR PRIMARY KEY, file_size BIGINT, mtime_ns BIGINT, content_hash VARCHAR,
+                options_key VARCHAR, cached_at TIMESTAMP
+            )
+        """)
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS agg_cache.partials (
+                path VARCHAR, dimension VARCHAR, project VARCHAR, key VARCHAR, period TIMESTAMP, total_size HUGEINT, object_count BIGINT
+            )
+        """)
+
+    def close(self):
+        """Detaches the cache file, so the connection can outlive this cache."""
+        self.con.execute("DETACH agg_cache")
+
+    def fingerprint(self, path):
+        stat = os.stat(path)
+        content_hash = self._content_hash(path) if self.use_content_hash else None
+        return (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns, content_hash)
+
+    def lookup(self, path):
+        """Returns (fingerprint, partials); partials is None when the file is new or has changed."""
+        fingerprint = self.fingerprint(path)
+        resolved, file_size, mtime_ns, content_hash = fingerprint
+        entry = self.con.execute(
+            "SELECT content_hash FROM agg_cache.entries WHERE path = ? AND file_size = ? AND mtime_ns = ? AND options_key = ?",
+            [resolved, file_size, mtime_ns, self.options_key]
+        ).fetchone()
+        if entry is None or (self.use_content_hash and entry[0] != content_hash):
+            self.misses += 1
+            return fingerprint, None
+        self.hits += 1
+        self.con.execute(
+            "SELECT dimension, project, key, period, total_size, object_count FROM agg_cache.partials WHERE path = ?", [resolved]
+        )
+        return fingerprint, fetch_arrow_table(self.con)
+
+    def store(self, fingerprint, partials):
+        resolved, file_size, mtime_ns, content_hash = fingerprint
+        self.con.register('partials_to_cache', partials)
+        try:
+            self.con.execute("BEGIN TRANSACTION")
+            self.con.execute("DELETE FROM agg_cache.partials WHERE path = ?", [resolved])
+            self.con.execute("DELETE FROM agg_cache.entries WHERE path = ?", [resolved])
+            self.con.execute(
+                "INSERT INTO agg_cache.partials SELECT ?::VARCHAR, dimension, project, key, period, total_size, object_count FROM partials_to_cache",
+                [resolved]
+            )
+            self.con.execute(
+                "INSERT INTO agg_cache.entries VALUES (?, ?, ?, ?, ?, now())",
+                [resolved, file_size, mtime_ns, content_hash, self.options_key]
+            )
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+        finally:
+            self.con.unregister('partials_to_cache')
+
+    def prune(self):
+        """Drops entries whose file is gone, has changed on disk, or was parsed with different reader options."""
+        stale = []
+        for path, file_size, mtime_ns, options_key in self.con.execute("SELECT path, file_size, mtime_ns, options_key FROM agg_cache.entries").fetchall():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stale.append(path)
+                continue
+            if (stat.st_size, stat.st_mtime_ns, options_key) != (file_size, mtime_ns, self.options_key):
+                stale.append(path)
+        for path in stale:
+            self.con.execute("DELETE FROM agg_cache.partials WHERE path = ?", [path])
+            self.con.execute("DELETE FROM agg_cache.entries WHERE path = ?", [path])
+        return len(stale)
+
+    @staticmethod
+    def _content_hash(path, chunk_size=8 * 1024 * 1024):
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
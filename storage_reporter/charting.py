@@ -1,51 +1,221 @@
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import time
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
 import matplotlib.dates as mdates
-import pandas as pd
-from .utils import format_bytes
+import numpy as np
+from .profiling import peak_rss_bytes, profile_stage
+from .utils import column, column_names, detached, format_bytes, format_signed_bytes, num_rows
+
+# File size bands in the order the size distribution charts show them.
+SIZE_CATEGORY_ORDER = ('0 B', '< 1 KB', '1 KB - 1 MB', '1 MB - 1 GB', '1 GB - 1 TB', '> 1 TB')
+
+_worker_generator = None
+
+def _init_chart_worker(config, charts_dir):
+    global _worker_generator
+    plt.switch_backend('Agg')
+    _worker_generator = ChartGenerator(config, charts_dir, use_cache=False)
+
+def _render_chart_job(spec):
+    """Renders one chart; returns its path and the worker-side timings for --profile."""
+    method, args, kwargs = spec
+    wall, cpu = time.perf_counter(), time.process_time()
+    path = getattr(_worker_generator, method)(*args, **kwargs)
+    return path, {'wall_s': round(time.perf_counter() - wall, 6), 'cpu_s': round(time.process_time() - cpu, 6),
+                  'peak_rss_bytes': peak_rss_bytes(), 'worker_pid': os.getpid()}
+
+def _update_digest(digest, value):
+    if hasattr(value, 'column_names') or hasattr(value, 'dtypes'):
+        # A pandas DataFrame or pyarrow Table, hashed column by column from the same NumPy arrays the charts plot.
+        for name in column_names(value):
+            values = column(value, name)
+            digest.update(repr((name, str(values.dtype), len(values))).encode())
+            if values.dtype == object:
+                digest.update("\x00".join(map(str, values.tolist())).encode())
+            else:
+                digest.update(np.ascontiguousarray(values).tobytes())
+    elif isinstance(value, dict):
+        for k in sorted(value):
+            digest.update(repr(k).encode())
+            _update_digest(digest, value[k])
+    else:
+        digest.update(repr(value).encode())
 
 class ChartGenerator:
-    def __init__(self, config, charts_dir):
+    # Bump whenever the plotting code changes so previously cached PNGs are redrawn.
+    CHART_CACHE_VERSION = 3
+    CACHE_CONFIG_KEYS = ('chart_style', 'chart_title_fontsize', 'chart_label_fontsize', 'chart_xaxis_rotation', 'chart_format')
+
+    def __init__(self, config, charts_dir, use_cache=True, profiler=None):
         self.config = config
+        self.profiler = profiler
         self.charts_dir = charts_dir
-        self.charts_dir.mkdir(exist_ok=True)
+        self.charts_dir.mkdir(parents=True, exist_ok=True)
+        # Styles only add to the current rcParams, so they are reset first: a warm server worker would otherwise carry
+        # an earlier job's style into this one's charts.
+        matplotlib.rc_file_defaults()
         plt.style.use(config['chart_style'])
+        # In-memory charts never touch disk, so there is nothing to reuse between runs.
+        self.use_cache = use_cache and not config['chart_in_memory']
+        self.manifest_path = self.charts_dir / "chart_manifest.json"
+        self.manifest = json.loads(self.manifest_path.read_text()) if self.use_cache and self.manifest_path.exists() else {}
+        self.cache_hits = 0
+        self._pool = None
+        self._pool_workers = 0
 
     def generate_all_charts(self, aggs, prefix):
-        chart_paths = {
-            "Chart: Storage Dashboard": self._create_dashboard(aggs, prefix),
-            "Chart: Top 10 Projects by Size": self._plot_barh(aggs['top_projects'], 'project_id', 'total_size', 'Top 10 Projects by Size', self.charts_dir / f"{prefix}_top_projects.png"),
-            "Chart: Top 10 Buckets by Size": self._plot_barh(aggs['top_buckets'], 'bucket_name', 'total_size', 'Top 10 Buckets by Size', self.charts_dir / f"{prefix}_top_buckets.png"),
-            "Chart: Storage Distribution by Project": self._plot_pie(aggs['distribution_by_project'], 'project_id', 'total_size', 'Storage Distribution by Project', self.charts_dir / f"{prefix}_distribution_by_project_pie.png"),
-            "Chart: File Size Distribution": self._plot_bar(aggs['size_distribution'], 'size_category', 'object_count', 'File Size Distribution', self.charts_dir / f"{prefix}_size_distribution.png"),
-            "Chart: Cumulative Monthly Storage Growth": self._plot_timeseries(aggs['monthly_growth'], 'month', 'monthly_size', 'Cumulative Monthly Storage Growth', self.charts_dir / f"{prefix}_monthly_growth.png", time_unit='month'),
-            "Chart: Cumulative Yearly Storage Growth": self._plot_timeseries(aggs['yearly_growth'], 'year', 'yearly_size', 'Cumulative Yearly Storage Growth', self.charts_dir / f"{prefix}_yearly_growth.png", time_unit='year')
-        }
+        chart_paths = {}
+        for title, spec in self._chart_specs(aggs, prefix).items():
+            with profile_stage(self.profiler, 'chart', source=prefix, name=title) as record:
+                key = self._chart_key(spec)
+                chart_paths[title] = self._cached_chart(spec, key)
+                record['cached'] = chart_paths[title] is not None
+                if chart_paths[title] is None:
+                    method, args, kwargs = spec
+                    chart_paths[title] = self._remember(key, getattr(self, method)(*args, **kwargs))
         return {k: v for k, v in chart_paths.items() if v is not None}
 
+    def generate_charts_parallel(self, sections, workers):
+        """Renders the charts of many (aggs, prefix) sections in an Agg-backed process pool, one job per chart."""
+        paths = [{} for _ in sections]
+        jobs = []
+        for index, (aggs, prefix) in enumerate(sections):
+            for title, spec in self._chart_specs(aggs, prefix).items():
+                key = self._chart_key(spec)
+                paths[index][title] = self._cached_chart(spec, key)
+                if paths[index][title] is None:
+                    jobs.append((index, title, key, spec))
+        if jobs:
+            pool = self._get_pool(workers)
+            specs = [(method, tuple(detached(arg) for arg in args), kwargs) for *_, (method, args, kwargs) in jobs]
+            for (index, title, key, _), (path, timing) in zip(jobs, pool.map(_render_chart_job, specs)):
+                paths[index][title] = self._remember(key, path)
+                if self.profiler:
+                    self.profiler.add('chart', source=sections[index][1], name=title, cached=False, worker=True, **timing)
+        return [{k: v for k, v in chart_paths.items() if v is not None} for chart_paths in paths]
+
+    def close(self):
+        """Writes the chart manifest and shuts down the chart worker pool, if one was started."""
+        self._save_manifest()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _get_pool(self, workers):
+        # The pool outlives a single call so batches of sections don't pay the worker start-up cost again.
+        if self._pool is None or self._pool_workers != workers:
+            self.close()
+            self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_chart_worker, initargs=(self.config, self.charts_dir))
+            self._pool_workers = workers
+        return self._pool
+
+    def _chart_key(self, spec):
+        """Hashes a chart's input data together with the config values that affect how it looks."""
+        method, args, kwargs = spec
+        digest = hashlib.sha256()
+        digest.update(repr((self.CHART_CACHE_VERSION, method, [self.config[k] for k in self.CACHE_CONFIG_KEYS], sorted(kwargs.items()))).encode())
+        for arg in args[:-1]:
+            _update_digest(digest, arg)
+        return digest.hexdigest()
+
+    def _cached_chart(self, spec, key):
+        save_path = spec[1][-1]
+        if self.use_cache and self.manifest.get(save_path.name) == key and save_path.exists():
+            self.cache_hits += 1
+            return save_path
+        return None
+
+    def _remember(self, key, save_path):
+        if self.use_cache and save_path is not None:
+            self.manifest[save_path.name] = key
+        return save_path
+
+    def _save_manifest(self):
+        # Written once per run rather than per section, so runs over thousands of sources don't rewrite it each time;
+        # entries whose chart file is gone are dropped.
+        if self.use_cache:
+            self.manifest = {name: key for name, key in self.manifest.items() if (self.charts_dir / name).exists()}
+            self.manifest_path.write_text(json.dumps(self.manifest, indent=2, sort_keys=True))
+
+    def _chart_specs(self, aggs, prefix):
+        """Maps each chart title to the (method, args, kwargs) plot spec that renders it; the last arg is the save path."""
+        if 'change_summary' in aggs:
+            return self._change_chart_specs(aggs, prefix)
+        if 'project' in aggs:
+            return self._project_chart_specs(aggs, prefix)
+        return {
+            "Chart: Storage Dashboard": ('_create_dashboard', ({k: aggs[k] for k in ('summary', 'distribution_by_project', 'top_buckets', 'size_distribution')}, self._chart_path(prefix, "dashboard")), {}),
+            "Chart: Top 10 Projects by Size": ('_plot_barh', (aggs['top_projects'], 'project_id', 'total_size', 'Top 10 Projects by Size', self._chart_path(prefix, "top_projects")), {}),
+            "Chart: Top 10 Buckets by Size": ('_plot_barh', (aggs['top_buckets'], 'bucket_name', 'total_size', 'Top 10 Buckets by Size', self._chart_path(prefix, "top_buckets")), {}),
+            "Chart: Storage Distribution by Project": ('_plot_pie', (aggs['distribution_by_project'], 'project_id', 'total_size', 'Storage Distribution by Project', self._chart_path(prefix, "distribution_by_project_pie")), {}),
+            "Chart: File Size Distribution": ('_plot_bar', (aggs['size_distribution'], 'size_category', 'object_count', 'File Size Distribution', self._chart_path(prefix, "size_distribution")), {}),
+            "Chart: Cumulative Monthly Storage Growth": ('_plot_timeseries', (aggs['monthly_growth'], 'month', 'monthly_size', 'Cumulative Monthly Storage Growth', self._chart_path(prefix, "monthly_growth")), {'time_unit': 'month'}),
+            "Chart: Cumulative Yearly Storage Growth": ('_plot_timeseries', (aggs['yearly_growth'], 'year', 'yearly_size', 'Cumulative Yearly Storage Growth', self._chart_path(prefix, "yearly_growth")), {'time_unit': 'year'}),
+        }
+
+    def _project_chart_specs(self, aggs, prefix):
+        # A drill-down covers one project, so the project-level charts and the dashboard built on them are left out.
+        return {
+            "Chart: Top 10 Buckets by Size": ('_plot_barh', (aggs['top_buckets'], 'bucket_name', 'total_size', 'Top 10 Buckets by Size', self._chart_path(prefix, "top_buckets")), {}),
+            "Chart: File Size Distribution": ('_plot_bar', (aggs['size_distribution'], 'size_category', 'object_count', 'File Size Distribution', self._chart_path(prefix, "size_distribution")), {}),
+            "Chart: Cumulative Monthly Storage Growth": ('_plot_timeseries', (aggs['monthly_growth'], 'month', 'monthly_size', 'Cumulative Monthly Storage Growth', self._chart_path(prefix, "monthly_growth")), {'time_unit': 'month'}),
+            "Chart: Cumulative Yearly Storage Growth": ('_plot_timeseries', (aggs['yearly_growth'], 'year', 'yearly_size', 'Cumulative Yearly Storage Growth', self._chart_path(prefix, "yearly_growth")), {'time_unit': 'year'}),
+        }
+
+    def _change_chart_specs(self, aggs, prefix):
+        return {
+            "Chart: Object Changes by Type": ('_plot_change_types', (aggs['change_summary'], 'Object Changes by Type', self._chart_path(prefix, "change_types")), {}),
+            "Chart: Net Storage Change by Project": ('_plot_delta_barh', (aggs['project_changes'], 'project_id', 'net_size_delta', 'Net Storage Change by Project', self._chart_path(prefix, "project_changes")), {}),
+            "Chart: Net Storage Change by Bucket": ('_plot_delta_barh', (aggs['bucket_changes'], 'bucket_name', 'net_size_delta', 'Net Storage Change by Bucket', self._chart_path(prefix, "bucket_changes")), {}),
+        }
+
+    def _chart_path(self, prefix, name):
+        return self.charts_dir / f"{prefix}_{name}.{self.config['chart_format']}"
+
+    def _save_figure(self, fig, save_path, dpi):
+        """Writes the figure to `save_path`, or to an in-memory buffer when chart_in_memory is set."""
+        target = io.BytesIO() if self.config['chart_in_memory'] else save_path
+        # fpdf2 does not understand the SVG <metadata> block, so it is left out.
+        metadata = {'Creator': None, 'Date': None, 'Format': None, 'Type': None} if self.config['chart_format'] == 'svg' else None
+        fig.savefig(target, format=self.config['chart_format'], dpi=dpi, metadata=metadata)
+        plt.close(fig)
+        return target
+
     def _plot_barh(self, df, cat_col, val_col, title, save_path):
-        if df.empty: 
+        if not num_rows(df):
             return None
         fig, ax = plt.subplots(figsize=(10, 7))
-        df = df.sort_values(by=val_col, ascending=True)
-        bars = ax.barh(df[cat_col], df[val_col], color='skyblue')
+        categories, values = _sorted_columns(df, cat_col, val_col)
+        bars = ax.barh(categories, values, color='skyblue')
         ax.set_title(title, fontsize=self.config['chart_title_fontsize'])
         ax.set_xlabel('Total Size', fontsize=self.config['chart_label_fontsize'])
         ax.xaxis.set_major_formatter(mticker.FuncFormatter(lambda x, p: format_bytes(x)))
-        ax.bar_label(bars, labels=[format_bytes(s) for s in df[val_col]], padding=3)
+        ax.bar_label(bars, labels=[format_bytes(s) for s in values.tolist()], padding=3)
         ax.tick_params(axis='both', which='major', labelsize=self.config['chart_label_fontsize'])
         fig.tight_layout()
-        plt.savefig(save_path, dpi=120)
-        plt.close(fig)
-        return save_path
+        return self._save_figure(fig, save_path, dpi=120)
 
     def _plot_pie(self, df, label_col, val_col, title, save_path):
-        if df.empty: return None
+        if not num_rows(df): return None
         fig, ax = plt.subplots(figsize=(10, 8))
-        
-        if len(df) == 1:
-            item_name = df[label_col].iloc[0]
-            size = df[val_col].iloc[0]
+        self._draw_pie(ax, df, label_col, val_col, title)
+        fig.tight_layout()
+        return self._save_figure(fig, save_path, dpi=120)
+
+    def _draw_pie(self, ax, df, label_col, val_col, title):
+        """Draws the share-of-total pie into `ax`, falling back to a single bar when there is only one item."""
+        labels, sizes = column(df, label_col), column(df, val_col)
+        if len(labels) == 1:
+            item_name = labels[0]
+            size = sizes[0]
             ax.bar([item_name], [size], color='steelblue', width=0.5)
             ax.set_title(title + "\n(Single Item Found)", fontsize=self.config['chart_title_fontsize'])
             ax.set_ylabel('Total Size', fontsize=self.config['chart_label_fontsize'])
@@ -53,40 +223,28 @@ class ChartGenerator:
             ax.text(0, size, f' {format_bytes(size)}', ha='center', va='bottom', fontsize=12, weight='bold')
             ax.tick_params(axis='both', which='major', labelsize=self.config['chart_label_fontsize'])
         else:
-            df_copy = df.copy().sort_values(val_col, ascending=False)
-            
-            if len(df_copy) > 5: 
-                top_5 = df_copy.head(5)
-                others_size = df_copy.iloc[5:][val_col].sum()
-                others_row = pd.DataFrame({label_col: ['Others'], val_col: [others_size]})
-                grouped_df = pd.concat([top_5, others_row])
-                
-            else: 
-                grouped_df = df_copy
-            
+            order = np.argsort(-sizes, kind='stable')
+            labels, sizes = labels[order].tolist(), sizes[order].tolist()
+            if len(labels) > 5:
+                labels, sizes = labels[:5] + ['Others'], sizes[:5] + [sum(sizes[5:])]
+
             def autopct_format(pct): 
                 return f'{pct:.1f}%' if pct > 3 else ''
             
-            wedges, _, autotexts = ax.pie(grouped_df[val_col], autopct=autopct_format, startangle=90, pctdistance=0.85)
+            wedges, _, autotexts = ax.pie(sizes, autopct=autopct_format, startangle=90, pctdistance=0.85)
             plt.setp(autotexts, size=10, weight="bold", color="white")
-            ax.legend(wedges, [f"{label} ({format_bytes(size)})" for label, size in zip(grouped_df[label_col], grouped_df[val_col])], title=label_col.replace('_', ' ').title(), loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
+            ax.legend(wedges, [f"{label} ({format_bytes(size)})" for label, size in zip(labels, sizes)], title=label_col.replace('_', ' ').title(), loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
             ax.set_title(title, fontsize=self.config['chart_title_fontsize'])
             ax.axis('equal')
-        fig.tight_layout()
-        plt.savefig(save_path, dpi=120)
-        plt.close(fig)
-        return save_path
 
     # --- UPDATED: Use dynamic rotation ---
     def _plot_bar(self, df, cat_col, val_col, title, save_path):
-        if df.empty: 
+        if not num_rows(df):
             return None
-        
-        category_order = ['0 B', '< 1 KB', '1 KB - 1 MB', '1 MB - 1 GB', '1 GB - 1 TB', '> 1 TB']
-        df[cat_col] = pd.Categorical(df[cat_col], categories=category_order, ordered=True)
-        df = df.sort_values(cat_col)
+
+        categories, values = _size_bands(df, cat_col, val_col)
         fig, ax = plt.subplots(figsize=(10, 6))
-        ax.bar(df[cat_col], df[val_col], color='purple')
+        ax.bar(categories, values, color='purple')
         ax.set_title(title, fontsize=self.config['chart_title_fontsize'])
         ax.set_ylabel('Number of Objects (Log Scale)', fontsize=self.config['chart_label_fontsize'])
         ax.set_yscale('log')
@@ -97,22 +255,54 @@ class ChartGenerator:
 
         ax.tick_params(axis='both', which='major', labelsize=self.config['chart_label_fontsize'])
         fig.tight_layout()
-        plt.savefig(save_path, dpi=120)
-        plt.close(fig)
-        
-        return save_path
+        return self._save_figure(fig, save_path, dpi=120)
+
+    def _plot_change_types(self, df, title, save_path):
+        counts = column(df, 'object_count')
+        if counts.sum() == 0:
+            return None
+        fig, ax = plt.subplots(figsize=(10, 6))
+        bars = ax.bar([change.title() for change in column(df, 'change').tolist()], counts, color=['seagreen', 'indianred', 'goldenrod'])
+        ax.set_title(title, fontsize=self.config['chart_title_fontsize'])
+        ax.set_ylabel('Number of Objects', fontsize=self.config['chart_label_fontsize'])
+        ax.bar_label(bars, labels=[f"{count:,}\n{format_signed_bytes(delta)}" for count, delta in zip(counts.tolist(), column(df, 'size_delta').tolist())], padding=3)
+        ax.margins(y=0.2)
+        ax.tick_params(axis='both', which='major', labelsize=self.config['chart_label_fontsize'])
+        fig.tight_layout()
+        return self._save_figure(fig, save_path, dpi=120)
+
+    def _plot_delta_barh(self, df, cat_col, val_col, title, save_path):
+        """Diverging bar chart of signed size changes: growth in green to the right, shrinkage in red to the left."""
+        if not num_rows(df):
+            return None
+        fig, ax = plt.subplots(figsize=(10, 7))
+        categories, values = _sorted_columns(df, cat_col, val_col)
+        bars = ax.barh(categories, values, color=['seagreen' if v >= 0 else 'indianred' for v in values.tolist()])
+        ax.axvline(0, color='black', linewidth=0.8)
+        ax.set_title(title, fontsize=self.config['chart_title_fontsize'])
+        ax.set_xlabel('Net Size Change', fontsize=self.config['chart_label_fontsize'])
+        ax.xaxis.set_major_formatter(mticker.FuncFormatter(lambda x, p: format_signed_bytes(x)))
+        ax.bar_label(bars, labels=[format_signed_bytes(v) for v in values.tolist()], padding=3)
+        ax.margins(x=0.25)
+        ax.tick_params(axis='both', which='major', labelsize=self.config['chart_label_fontsize'])
+        fig.tight_layout()
+        return self._save_figure(fig, save_path, dpi=120)
 
     # --- UPDATED: Use dynamic rotation ---
     def _plot_timeseries(self, df, date_col, val_col, title, save_path, time_unit='month'):
-        if df.empty or df[date_col].isnull().all(): 
+        if not num_rows(df):
+            return None
+        dates = column(df, date_col).astype('datetime64[us]')
+        if np.isnat(dates).all():
             return None
 
-        df_copy = df.copy().sort_values(by=date_col)
-        df_copy['cumulative_size'] = df_copy[val_col].cumsum()
+        # NaT sorts last, like pandas puts missing dates last.
+        order = np.argsort(dates, kind='stable')
+        dates, cumulative_size = dates[order], np.cumsum(column(df, val_col)[order])
 
         fig, ax = plt.subplots(figsize=(12, 6))
-        ax.plot(df_copy[date_col], df_copy['cumulative_size'], marker='.', linestyle='-')
-        ax.fill_between(df_copy[date_col], df_copy['cumulative_size'], alpha=0.2)
+        ax.plot(dates, cumulative_size, marker='.', linestyle='-')
+        ax.fill_between(dates, cumulative_size, alpha=0.2)
 
         ax.set_title(title, fontsize=self.config['chart_title_fontsize'])
         ax.set_ylabel('Total Storage', fontsize=self.config['chart_label_fontsize'])
@@ -123,7 +313,7 @@ class ChartGenerator:
             ax.xaxis.set_major_locator(mdates.YearLocator())
             ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y'))
         else:
-            num_months = len(df_copy[date_col].unique())
+            num_months = len(np.unique(dates))
             interval = 6 if num_months > 24 else 3 if num_months > 12 else 1
             ax.xaxis.set_major_locator(mdates.MonthLocator(interval=interval))
             ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
@@ -133,12 +323,9 @@ class ChartGenerator:
         plt.setp(ax.get_xticklabels(), rotation=rotation, ha=ha)
 
         fig.tight_layout()
-        plt.savefig(save_path, dpi=120)
-        plt.close(fig)
-        return save_path
+        return self._save_figure(fig, save_path, dpi=120)
 
-    def _create_dashboard(self, aggs, prefix):
-        save_path = self.charts_dir / f"{prefix}_dashboard.png"
+    def _create_dashboard(self, aggs, save_path):
         fig = plt.figure(figsize=(20, 14), constrained_layout=True)
         fig.suptitle('Storage Analysis Dashboard', fontsize=28, weight='bold')
         gs = fig.add_gridspec(2, 2)
@@ -149,39 +336,39 @@ class ChartGenerator:
         ax_main.text(0.5, 0.5, text, ha='center', va='center', fontsize=24, bbox=dict(boxstyle="round,pad=0.5", fc="aliceblue", ec="b", lw=2))
         ax_pie = fig.add_subplot(gs[0, 1])
         df_proj = aggs['distribution_by_project']
-        pie_chart_path_for_dashboard = self.charts_dir / f"{prefix}_dashboard_pie_temp.png"
-        self._plot_pie(df_proj, 'project_id', 'total_size', 'Storage by Project', pie_chart_path_for_dashboard)
-        
-        if pie_chart_path_for_dashboard.exists(): 
-            ax_pie.imshow(plt.imread(pie_chart_path_for_dashboard))
-        
-        pie_chart_path_for_dashboard.unlink()
-        ax_pie.axis('off')
+        if not num_rows(df_proj):
+            ax_pie.axis('off')
+        else:
+            self._draw_pie(ax_pie, df_proj, 'project_id', 'total_size', 'Storage by Project')
         ax_buckets = fig.add_subplot(gs[1, 0])
-        df_buckets = aggs['top_buckets']
-        
-        if not df_buckets.empty:
-            df_buckets = df_buckets.sort_values('total_size', ascending=True)
-        
-        bars = ax_buckets.barh(df_buckets['bucket_name'], df_buckets['total_size'], color='teal')
+        bucket_names, bucket_sizes = _sorted_columns(aggs['top_buckets'], 'bucket_name', 'total_size')
+        bars = ax_buckets.barh(bucket_names, bucket_sizes, color='teal')
         ax_buckets.set_title('Top Buckets by Size', fontsize=18)
         ax_buckets.xaxis.set_major_formatter(mticker.FuncFormatter(lambda x, p: format_bytes(x)))
-        ax_buckets.bar_label(bars, labels=[format_bytes(s) for s in df_buckets['total_size']], padding=3, fontsize=10)
+        ax_buckets.bar_label(bars, labels=[format_bytes(s) for s in bucket_sizes.tolist()], padding=3, fontsize=10)
         ax_buckets.tick_params(axis='both', which='major', labelsize=12)
         ax_dist = fig.add_subplot(gs[1, 1])
         df_dist = aggs['size_distribution']
-        
-        if not df_dist.empty:
-            category_order = ['0 B', '< 1 KB', '1 KB - 1 MB', '1 MB - 1 GB', '1 GB - 1 TB', '> 1 TB']
-            df_dist['size_category'] = pd.Categorical(df_dist['size_category'], categories=category_order, ordered=True)
-            df_dist = df_dist.sort_values('size_category').dropna()
-            ax_dist.bar(df_dist['size_category'], df_dist['object_count'], color='indigo')
+
+        if num_rows(df_dist):
+            categories, counts = _size_bands(df_dist, 'size_category', 'object_count')
+            ax_dist.bar(categories, counts, color='indigo')
             ax_dist.set_yscale('log')
             ax_dist.set_title('Size Distribution', fontsize=18)
             ax_dist.tick_params(axis='x', rotation=45, labelsize=12)
             ax_dist.tick_params(axis='y', which='major', labelsize=12)
             
-        plt.savefig(save_path, dpi=150)
-        plt.close(fig)
-        return save_path
-    
\ No newline at end of file
+        return self._save_figure(fig, save_path, dpi=150)
+
+def _sorted_columns(df, cat_col, val_col):
+    """The category and value columns ordered by ascending value, as horizontal bar charts draw them bottom-up."""
+    categories, values = column(df, cat_col), column(df, val_col)
+    order = np.argsort(values, kind='stable')
+    return categories[order].astype(str), values[order]
+
+def _size_bands(df, cat_col, val_col):
+    """The size bands present in `df` and their values, in SIZE_CATEGORY_ORDER."""
+    positions = {band: i for i, band in enumerate(SIZE_CATEGORY_ORDER)}
+    categories, values = column(df, cat_col).tolist(), column(df, val_col)
+    present = sorted((positions[c], i) for i, c in enumerate(categories) if c in positions)
+    return [SIZE_CATEGORY_ORDER[p] for p, _ in present], values[[i for _, i in present]]
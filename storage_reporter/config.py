@@ -2,27 +2,47 @@ import os
 import sys
 from dotenv import find_dotenv, load_dotenv
 
+IMAGE_ENCODINGS = ('lossless', 'quantize', 'jpeg')
+EXPORT_FORMATS = ('parquet', 'json', 'arrow')
+
 def parse_font_style(style_str):
     return "".join(c for c in str(style_str).upper() if c in 'BIU')
 def parse_color(config, prefix):
     return (int(config.get(f'{prefix}_R', 0)), int(config.get(f'{prefix}_G', 0)), int(config.get(f'{prefix}_B', 0)))
 def parse_bool(value):
     return str(value).lower() in ('true', '1', 't', 'y', 'yes')
+def parse_inventory_schema(columns_str, timestamp_format=None, delimiter=",", header=True):
+    """Parses 'name:TYPE,name:TYPE,...' (every CSV column, in file order) into the analyzer's declared schema."""
+    if not columns_str:
+        return None
+    columns = {}
+    for entry in columns_str.split(','):
+        name, sep, sql_type = entry.partition(':')
+        if not sep or not name.strip() or not sql_type.strip():
+            raise ValueError(f"expected 'name:TYPE', got {entry.strip()!r}")
+        columns[name.strip()] = sql_type.strip().upper()
+    missing = [c for c in ('project_id', 'bucket_name', 'size_bytes', 'content_type', 'creation_time_utc') if c not in columns]
+    if missing:
+        raise ValueError(f"missing required column(s): {', '.join(missing)}")
+    return {"columns": columns, "timestamp_format": timestamp_format or None, "delimiter": delimiter, "header": header}
 
-def load_config():
+def load_config(require_inputs=True):
+    """Reads settings from .env; with require_inputs=False (server, benchmarks) neither .env nor INPUT_FILES is required."""
     env_path = find_dotenv(raise_error_if_not_found=False)
-    if not env_path: 
+    if not env_path and require_inputs: 
         print("❌ Error: .env file not found.", file=sys.stderr)
         sys.exit(1)
-    load_dotenv(env_path)
+    if env_path:
+        load_dotenv(env_path)
 
     config = {
-        "csv_files": [p.strip() for p in os.getenv("CSV_FILES", "").split(',') if p.strip()],
+        # INPUT_FILES may list CSV (optionally .gz/.zst), Parquet or NDJSON files; CSV_FILES is still honoured.
+        "csv_files": [p.strip() for p in (os.getenv("INPUT_FILES") or os.getenv("CSV_FILES", "")).split(',') if p.strip()],
         "author": os.getenv("AUTHOR_NAME", "Unknown Author"),
         "version": os.getenv("REPORT_VERSION", "1.0")
     }
-    if not config["csv_files"]: 
-        print("❌ Error: CSV_FILES not set in .env file.", file=sys.stderr)
+    if require_inputs and not config["csv_files"]: 
+        print("❌ Error: INPUT_FILES (or CSV_FILES) not set in .env file.", file=sys.stderr)
         sys.exit(1)
 
     style_configs = {
@@ -49,12 +69,21 @@ def load_config():
         "table_title_font": ("font", "PDF_TABLE_TITLE"), "table_title_color": ("color", "PDF_TABLE_TITLE_FONT_COLOR"), "table_title_justification": ("str", "PDF_TABLE_TITLE_JUSTIFICATION", "L"),
         "body_font": ("font", "PDF_BODY"), "body_color": ("color", "PDF_BODY_FONT_COLOR"), "body_justification": ("str", "PDF_BODY_JUSTIFICATION", "L"),
         "bucket_name_style": ("style", "PDF_BUCKET_NAME_STYLE"),
+        "appendix_tables_enabled": ("bool", "PDF_APPENDIX_TABLES_ENABLED", "True"),
+        # Embedded images are resampled to this many pixels per printed inch (0 keeps them as rendered) and stored
+        # 'lossless', 'quantize'd to 256 colours or as 'jpeg'; the zlib level (0-9) applies to pages and images.
+        "pdf_image_dpi": ("int", "PDF_IMAGE_DPI", 150),
+        "pdf_image_encoding": ("str", "PDF_IMAGE_ENCODING", "lossless"),
+        "pdf_jpeg_quality": ("int", "PDF_JPEG_QUALITY", 85),
+        "pdf_compression_level": ("int", "PDF_COMPRESSION_LEVEL", 6),
 
         "chart_style": ("str", "CHART_STYLE", "seaborn-v0_8-darkgrid"),
         "chart_title_fontsize": ("int", "CHART_TITLE_FONTSIZE", 14),
         "chart_label_fontsize": ("int", "CHART_LABEL_FONTSIZE", 10),
         # --- DEFINITIVE FIX: Added the missing entry for chart_xaxis_rotation ---
         "chart_xaxis_rotation": ("int", "CHART_XAXIS_ROTATION", 45),
+        "chart_format": ("str", "CHART_FORMAT", "png"),
+        "chart_in_memory": ("bool", "CHART_IN_MEMORY", "False"),
     }
 
     for key, (kind, prefix, *default) in style_configs.items():
@@ -67,4 +96,24 @@ def load_config():
         elif kind == "int": config[key] = int(os.getenv(prefix, d))
         elif kind == "float": config[key] = float(os.getenv(prefix, d))
 
+    # Projects holding at least PROJECT_DRILLDOWN_MIN_PERCENT of all storage get a drill-down section, the largest
+    # PROJECT_DRILLDOWN_MAX_PROJECTS of them at most; without a threshold there are no drill-downs.
+    drilldown_min_percent = os.getenv("PROJECT_DRILLDOWN_MIN_PERCENT")
+    config["drilldown_min_percent"] = float(drilldown_min_percent) if drilldown_min_percent else None
+    config["drilldown_max_projects"] = int(os.getenv("PROJECT_DRILLDOWN_MAX_PROJECTS", 100))
+
+    if config["pdf_image_encoding"] not in IMAGE_ENCODINGS:
+        print(f"❌ Error: PDF_IMAGE_ENCODING must be one of {', '.join(IMAGE_ENCODINGS)}.", file=sys.stderr)
+        sys.exit(1)
+
+    # Optional declared CSV layout; without it every CSV file is sniffed and its types inferred.
+    try:
+        config["inventory_schema"] = parse_inventory_schema(
+            os.getenv("INVENTORY_SCHEMA"), os.getenv("INVENTORY_TIMESTAMP_FORMAT"),
+            os.getenv("INVENTORY_DELIMITER", ","), parse_bool(os.getenv("INVENTORY_HEADER", "True"))
+        )
+    except ValueError as e:
+        print(f"❌ Error: invalid INVENTORY_SCHEMA in .env file: {e}", file=sys.stderr)
+        sys.exit(1)
+
     return config
\ No newline at end of file
@@ -0,0 +1,130 @@
+from datetime import date
+from decimal import Decimal
+import json
+from pathlib import Path
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+from .config import EXPORT_FORMATS
+from .utils import unique_name
+
+# Types of the scalar columns aggs can hold, flattened names included. Any of them may be None, such as
+# duplicates_removed outside --dedup runs or the whole estimate outside sampled ones, and pa.array() would give a
+# lone None the null type, so the column's type would change from one run to the next.
+SCALAR_TYPES = {
+    'rejected_rows': pa.int64(),
+    'duplicates_removed': pa.int64(),
+    'project': pa.string(),
+    'share': pa.float64(),
+    'estimate_sample_percent': pa.float64(),
+    'estimate_objects_margin': pa.float64(),
+    'estimate_size_margin': pa.float64(),
+    'estimate_distinct_projects': pa.int64(),
+    'estimate_distinct_buckets': pa.int64(),
+    'estimate_size_percentiles_50': pa.float64(),
+    'estimate_size_percentiles_95': pa.float64(),
+    'estimate_size_percentiles_99': pa.float64(),
+}
+
+def section_table(title, aggs):
+    """Packs a section's aggs into a one-row pyarrow Table.
+
+    Every tabular aggregate (a pyarrow Table, pandas DataFrame or dict of NumPy arrays) becomes a list-of-structs
+    column holding its rows, 'summary' becomes object_count and total_size columns, nested dicts such as 'estimate'
+    are flattened into prefixed columns and any other value becomes a scalar column, typed from SCALAR_TYPES; a
+    missing nested dict still gets its flattened columns, as nulls. Arrow inputs are reused as they are, so the column
+    data is not copied.
+    """
+    columns = {'title': pa.array([title], pa.string())}
+    for name, value in aggs.items():
+        if name == 'summary':
+            object_count, total_size = value
+            columns['object_count'] = pa.array([object_count], pa.int64())
+            # SUM over HUGEINT, which Arrow holds as a 38-digit decimal like DuckDB's own Arrow export does.
+            columns['total_size'] = pa.array([total_size], pa.decimal128(38, 0))
+        elif _is_table(value):
+            columns[name] = _rows_column(value)
+        elif isinstance(value, dict):
+            columns.update(_flattened(name, value))
+        elif value is None and any(key.startswith(f"{name}_") for key in SCALAR_TYPES):
+            columns.update({key: pa.nulls(1, type_) for key, type_ in SCALAR_TYPES.items() if key.startswith(f"{name}_")})
+        else:
+            columns[name] = _scalar_column(name, value)
+    return pa.table(columns)
+
+def _scalar_column(name, value):
+    return pa.array([value], SCALAR_TYPES.get(name))
+
+def _is_table(value):
+    if isinstance(value, dict):
+        return bool(value) and all(isinstance(v, np.ndarray) for v in value.values())
+    return hasattr(value, 'column_names') or hasattr(value, 'dtypes')
+
+def _rows_column(value):
+    if isinstance(value, dict):
+        table = pa.table(value)
+    elif hasattr(value, 'column_names'):
+        table = value
+    else:
+        table = pa.Table.from_pandas(value, preserve_index=False)
+    rows = pa.StructArray.from_arrays([c.combine_chunks() for c in table.columns], names=table.column_names)
+    return pa.ListArray.from_arrays(pa.array([0, len(rows)], pa.int32()), rows)
+
+def _flattened(prefix, values):
+    columns = {}
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            columns.update(_flattened(name, value))
+        else:
+            columns[name] = _scalar_column(name, value)
+    return columns
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # Only total_size is a decimal, with scale 0.
+        return int(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class SectionExporter:
+    """Writes each report section's aggregates to a file of its own in `export_dir`, in place of its charts and PDF
+    pages, plus an index.json listing the files in report order.
+
+    'parquet' and 'arrow' (an Arrow IPC file) hold the one-row table of section_table(); 'json' holds that row as an
+    object, with timestamps in ISO 8601.
+    """
+
+    EXTENSIONS = {'parquet': '.parquet', 'json': '.json', 'arrow': '.arrow'}
+
+    def __init__(self, export_dir, export_format):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"export format must be one of {', '.join(EXPORT_FORMATS)}, not {export_format!r}")
+        self.export_dir = Path(export_dir)
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        self.export_format = export_format
+        self.sections = []
+        self._names = set()
+
+    def write(self, name, title, aggs):
+        """Writes one section to `<name>` plus the format's extension and returns the file's path. A name an earlier
+        section already took, such as the stem of a.csv.gz and a.parquet, gets a numeric suffix."""
+        path = self.export_dir / f"{unique_name(name, self._names)}{self.EXTENSIONS[self.export_format]}"
+        table = section_table(title, aggs)
+        if self.export_format == 'parquet':
+            pq.write_table(table, path)
+        elif self.export_format == 'arrow':
+            with pa.ipc.new_file(path, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            path.write_text(json.dumps(table.to_pylist()[0], default=_json_default, indent=2))
+        self.sections.append({'title': title, 'file': path.name})
+        return path
+
+    def finish(self):
+        """Writes index.json and returns its path."""
+        index_path = self.export_dir / "index.json"
+        index_path.write_text(json.dumps({'format': self.export_format, 'sections': self.sections}, indent=2))
+        return index_path
@@ -0,0 +1,97 @@
+from contextlib import contextmanager
+import io
+from pathlib import Path
+import fpdf.image_parsing
+import fpdf.syntax
+from PIL import Image
+from .config import IMAGE_ENCODINGS
+
+@contextmanager
+def compression_level(level):
+    """Makes fpdf2 use zlib level `level` (0-9, or -1 for zlib's default) for page content and Flate-encoded images
+    inside the block, and restores the previous levels when it exits.
+
+    fpdf2 has no per-document setting for this, only these process-wide internals (hence the pinned fpdf2 version),
+    so callers scope it to the calls that compress: pdf.image() and pdf.output().
+    """
+    previous = fpdf.image_parsing.SETTINGS.compression_level, fpdf.syntax.PDFContentStream._COMPRESSION_LEVEL
+    fpdf.image_parsing.SETTINGS.compression_level = fpdf.syntax.PDFContentStream._COMPRESSION_LEVEL = level
+    try:
+        yield
+    finally:
+        fpdf.image_parsing.SETTINGS.compression_level, fpdf.syntax.PDFContentStream._COMPRESSION_LEVEL = previous
+
+class ImageOptimizer:
+    """Prepares raster images for pdf.image() at the size they are printed.
+
+    Images with more than `dpi` pixels per printed inch are resampled down to it and, depending on `encoding`, kept
+    lossless, reduced to a 256-colour palette ('quantize') or JPEG-encoded at `jpeg_quality`. SVG charts pass through
+    untouched. Repeated assets such as the logo are prepared once when drawn with `cache`, so that, being the same
+    image data each time, fpdf2 embeds them as a single XObject; charts are drawn once and are not kept.
+    """
+
+    def __init__(self, dpi=150, encoding='lossless', jpeg_quality=85):
+        if encoding not in IMAGE_ENCODINGS:
+            raise ValueError(f"image encoding must be one of {', '.join(IMAGE_ENCODINGS)}, not {encoding!r}")
+        self.dpi = dpi
+        self.encoding = encoding
+        self.jpeg_quality = jpeg_quality
+        self._prepared = {}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(dpi=config['pdf_image_dpi'], encoding=config['pdf_image_encoding'], jpeg_quality=config['pdf_jpeg_quality'])
+
+    def prepare(self, source, w=None, h=None, cache=True):
+        """Returns what to pass to pdf.image() for `source` (a path or an in-memory image buffer) printed `w` mm wide
+        or `h` mm high. With `cache`, the prepared image of a path is kept for the next call at the same size."""
+        if self._is_svg(source):
+            # fpdf2 only recognises SVG from a str path or a buffer, so Path objects are passed as strings.
+            return str(source) if isinstance(source, Path) else source
+        if not isinstance(source, (str, Path)):
+            return self._optimize(source, w, h)
+        if not cache:
+            return self._optimize(str(source), w, h)
+        key = (str(source), w, h)
+        if key not in self._prepared:
+            self._prepared[key] = self._optimize(str(source), w, h)
+        return self._prepared[key]
+
+    def _optimize(self, source, w, h):
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        img = Image.open(source)
+        # Pixels that fit the printed size at the target density; the image's aspect ratio is always kept.
+        scale = 1.0
+        if self.dpi:
+            target = (w / 25.4 * self.dpi / img.width) if w else (h / 25.4 * self.dpi / img.height)
+            scale = min(1.0, target)
+        if scale == 1.0 and self.encoding == 'lossless':
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            return source
+        if scale < 1.0:
+            if img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                img = img.convert('RGBA')
+            img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+        if self.encoding == 'lossless':
+            return img
+        # Charts and logos are drawn on white pages, so transparency is flattened onto white before lossy encoding.
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, 'white')
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        else:
+            img = img.convert('RGB')
+        if self.encoding == 'quantize':
+            return img.quantize(colors=256, method=Image.Quantize.MEDIANCUT)
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=self.jpeg_quality, optimize=True)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _is_svg(source):
+        if isinstance(source, (str, Path)):
+            return str(source).lower().endswith('.svg')
+        return source.getvalue().lstrip()[:5] in (b'<?xml', b'<svg ')
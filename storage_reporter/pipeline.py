@@ -0,0 +1,250 @@
+from dataclasses import dataclass
+import json
+import os
+from pathlib import Path
+import time
+from storage_reporter.config import EXPORT_FORMATS
+
+@dataclass
+class ReportOptions:
+    """How a report run scans, caches and renders; mirrors the main.py command-line flags."""
+    threads: int = max(1, os.cpu_count() or 1)
+    memory_limit: str = None
+    db: str = None
+    temp_dir: str = None
+    workers: int = 1
+    chart_workers: int = 1
+    # Above 1, sections are laid out as separate PDFs in this many processes and merged at the end.
+    pdf_workers: int = 1
+    approximate: float = None
+    no_cache: bool = False
+    prune_cache: bool = False
+    no_chart_cache: bool = False
+    cache_hash: bool = False
+    profile: str = None
+    profile_explain: bool = False
+    # Count each object once in the combined analysis, keeping its newest row, whether its copies are in one file or several.
+    dedup: bool = False
+    # Files of an earlier inventory snapshot; when set, the report ends with a Changes section diffing against it.
+    previous: list = None
+    # One of config.EXPORT_FORMATS: write each section's aggregates to a file instead of charting them into a PDF.
+    export: str = None
+
+    def __post_init__(self):
+        if self.approximate is not None and not 0 < self.approximate <= 100:
+            raise ValueError("approximate takes a percentage between 0 and 100")
+        if self.export is not None and self.export not in EXPORT_FORMATS:
+            raise ValueError(f"export takes one of {', '.join(EXPORT_FORMATS)}")
+
+def write_sections(batch, chart_generator, pdf_generator, chart_workers):
+    """Charts a batch of analyzed (section, chart_prefix) pairs, in parallel when asked, then writes them to the PDF."""
+    to_chart = [(section, prefix) for section, prefix in batch if prefix is not None]
+    if chart_workers > 1 and to_chart:
+        rendered = chart_generator.generate_charts_parallel([(section['aggs'], prefix) for section, prefix in to_chart], chart_workers)
+        for (section, _), charts in zip(to_chart, rendered):
+            section['charts'] = charts
+    else:
+        for section, prefix in to_chart:
+            section['charts'] = chart_generator.generate_all_charts(section['aggs'], prefix)
+    for section, _ in batch:
+        start = time.perf_counter()
+        pages = pdf_generator.add_section(section['title'], section['aggs'], section['charts'], section.get('level', 0))
+        # A parallel generator only queues the section; its timing is reported when the parts are merged.
+        if pages is not None:
+            print(f"  --> Wrote '{section['title']}' to the PDF in {time.perf_counter() - start:.2f}s ({pages} page(s)).")
+
+def run_report(config, output_dir, options, con=None):
+    """Analyzes config['csv_files'] and writes the PDF report into `output_dir`; returns the report's path. With
+    options.export, writes one file per section into `output_dir`/export instead and returns that directory.
+
+    `con` is an in-memory DuckDB connection to run on instead of a new one, such as a server worker's warm connection;
+    it is configured for this run and left open. Runs with options.db open their warehouse file themselves.
+    """
+    # duckdb, pandas, matplotlib and fpdf2 take most of a second to import, so they load only once a report runs, and
+    # an export never loads matplotlib or fpdf2 at all.
+    from storage_reporter.analyzer import DataAnalyzer, configure_connection, create_connection, source_stem
+    from storage_reporter.cache import AggregateCache
+    from storage_reporter.warehouse import Warehouse
+    from storage_reporter.profiling import Profiler
+    from storage_reporter.utils import format_bytes, unique_name
+    import numpy as np
+    if options.export:
+        from storage_reporter.export import SectionExporter
+    else:
+        from storage_reporter.charting import ChartGenerator
+        from storage_reporter.reporter import PDFReportGenerator, ParallelPDFReportGenerator
+
+    output_dir = Path(output_dir)
+    # Runs without the aggregate cache would otherwise leave nothing to create it before charts and the PDF go in.
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if options.approximate:
+        config["draft_watermark_enabled"] = True
+
+    # Initialize components
+    if options.db:
+        Path(options.db).parent.mkdir(parents=True, exist_ok=True)
+    borrowed = con is not None and not options.db
+    if borrowed:
+        configure_connection(con, options.threads, options.memory_limit, temp_directory=options.temp_dir)
+    else:
+        con = create_connection(options.threads, options.memory_limit, database=options.db or ':memory:', temp_directory=options.temp_dir)
+    profiler = Profiler(explain=options.profile_explain) if options.profile else None
+    if profiler:
+        profiler.watch(con)
+
+    reader_options = json.dumps(config["inventory_schema"], sort_keys=True) if config["inventory_schema"] else ""
+    # Drill-downs add per-project rows to the partials, so partials cached without them must not be served.
+    cache_options = reader_options + ("|drilldowns" if config["drilldown_min_percent"] is not None else "")
+    # Sampled partials are estimates and must never be served as exact figures later, so sampling bypasses the cache.
+    cache = None if options.no_cache or options.approximate else AggregateCache(con, output_dir / "aggregate_cache.duckdb", use_content_hash=options.cache_hash, options_key=cache_options)
+    if cache and options.prune_cache:
+        print(f"🧹 Pruned {cache.prune()} stale entries from the aggregate cache.")
+    warehouse = Warehouse(con, options_key=reader_options, profiler=profiler) if options.db else None
+    if warehouse and options.prune_cache:
+        print(f"🧹 Dropped {warehouse.prune()} stale source tables from the warehouse.")
+
+    analyzer = DataAnalyzer(con, cache=cache, inventory_schema=config["inventory_schema"], warehouse=warehouse, sample_percent=options.approximate, profiler=profiler, dedup=options.dedup,
+                            drilldown_min_percent=config["drilldown_min_percent"], drilldown_max_projects=config["drilldown_max_projects"], arrow=True)
+    exporter = SectionExporter(output_dir / "export", options.export) if options.export else None
+    chart_generator = None if exporter else ChartGenerator(config, output_dir / "charts", use_cache=not options.no_chart_cache, profiler=profiler)
+
+    print(f"\n--- Starting Storage {'Aggregate Export' if exporter else 'PDF Report Generation'} ---")
+    if options.approximate:
+        print(f"Approximate mode: estimating from a {options.approximate:g}% sample of objects.")
+    start_time = time.time()
+
+    pdf_generator = None
+    try:
+        # A DuckDB database file has a single writer, so warehouse ingestion stays in this process.
+        if options.workers > 1 and not warehouse:
+            print(f"\nScanning {len(config['csv_files'])} file(s) across {options.workers} worker processes...")
+            analyzer.prefetch_sources(config["csv_files"], options.workers, options.threads, options.memory_limit)
+
+        # Plan every section up front so the table of contents can be reserved before any data is analyzed.
+        num_sources = len(config["csv_files"])
+        has_combined_report = num_sources > 1
+        # Sources sharing a stem (a/inv.csv and b/inv.csv, inv.csv.gz and inv.parquet) get suffixed chart prefixes, so
+        # their charts don't overwrite each other; the other sections' prefixes are taken up front.
+        prefixes = {"combined", "changes"}
+        plan = [(f"Analysis for: {source_stem(f).replace('-', ' ').replace('_', ' ')}", 'source', f, unique_name(source_stem(f), prefixes))
+                for f in config["csv_files"]]
+        if has_combined_report:
+            plan.append(("Combined Analysis of All Files", 'combined', config["csv_files"], "combined"))
+        if config["drilldown_min_percent"] is not None:
+            plan.append(("Project Drill-downs", 'drilldowns', None, None))
+        if options.previous:
+            plan.append(("Changes Since Previous Snapshot", 'changes', options.previous, "changes"))
+        # An export already has every project and bucket in the overall section's listings.
+        if config["appendix_tables_enabled"] and not exporter:
+            plan.append(("Appendix: All Projects and Buckets", 'appendix', None, None))
+        total_steps = len(plan)
+
+        if not exporter:
+            if options.pdf_workers > 1:
+                print(f"Laying out PDF sections across {options.pdf_workers} worker processes.")
+                pdf_generator = ParallelPDFReportGenerator(config, [], output_dir, profiler=profiler, workers=options.pdf_workers)
+            else:
+                pdf_generator = PDFReportGenerator(config, [], output_dir, profiler=profiler)
+            pdf_generator.begin_report([title for title, _, _, _ in plan])
+
+        # Sections are written as soon as their charts exist and then dropped, so memory stays flat as sources grow.
+        batch = []
+        # The appendix lists every project and bucket of the combined analysis (or of the only file), whose projects
+        # are also the ones drilled down into.
+        listings = drilldowns = None
+        drilldowns_enabled = config["drilldown_min_percent"] is not None
+        for step, (title, kind, source, prefix) in enumerate(plan, start=1):
+            overall = kind == 'combined' or (kind == 'source' and not has_combined_report)
+            # Level 1 sections that follow this step's section, e.g. one per drilled-down project.
+            subsections = []
+            if kind == 'combined':
+                print(f"\n[{step}/{total_steps}] Analyzing all files combined...")
+                aggs = analyzer.analyze_combined(source, drilldowns=drilldowns_enabled)
+                if aggs['duplicates_removed'] is not None:
+                    print(f"  --> Removed {aggs['duplicates_removed']:,} duplicate object row(s), keeping each object's newest row.")
+            elif kind == 'drilldowns':
+                print(f"\n[{step}/{total_steps}] Drilling down into {len(drilldowns):,} project(s) holding at least {config['drilldown_min_percent']:g}% of all storage...")
+                aggs = {
+                    'drilldown_projects': {
+                        'project_id': np.array([d['project'] for d in drilldowns], dtype=object),
+                        'object_count': np.array([d['summary'][0] for d in drilldowns], dtype=np.int64),
+                        'total_size': np.array([d['summary'][1] for d in drilldowns], dtype=np.float64),
+                        'share': np.array([d['share'] for d in drilldowns], dtype=np.float64),
+                    },
+                    'drilldown_min_percent': config['drilldown_min_percent'], 'drilldown_max_projects': config['drilldown_max_projects'],
+                }
+                subsections = [({'title': f"Project: {d['project']}", 'aggs': d, 'charts': {}, 'level': 1}, f"project_{i:04d}")
+                               for i, d in enumerate(drilldowns, start=1)]
+                drilldowns = None
+            elif kind == 'appendix':
+                print(f"\n[{step}/{total_steps}] Listing all {len(listings['project_listing']):,} project(s) and {len(listings['bucket_listing']):,} bucket(s)...")
+                aggs = listings
+            elif kind == 'changes':
+                print(f"\n[{step}/{total_steps}] Comparing with the previous snapshot ({len(source)} file(s))...")
+                aggs = analyzer.analyze_changes(source, config["csv_files"])
+            else:
+                print(f"\n[{step}/{total_steps}] Analyzing individual file: {source}")
+                aggs = analyzer.analyze_source(source, drilldowns=drilldowns_enabled and overall)
+                if aggs['rejected_rows']:
+                    print(f"  ⚠️ {aggs['rejected_rows']:,} malformed row(s) in '{source}' could not be parsed and were left out.")
+
+            if overall:
+                listings = {key: aggs[key] for key in ('project_listing', 'bucket_listing')}
+                drilldowns = aggs.pop('project_drilldowns', None)
+
+            if exporter:
+                print(f"  --> Exported '{title}' to {exporter.write(prefix or kind, title, aggs)}.")
+                for section, name in subsections:
+                    exporter.write(name, section['title'], section['aggs'])
+                if subsections:
+                    print(f"  --> Exported {len(subsections):,} project drill-down(s) to {exporter.export_dir}.")
+                continue
+
+            # --- DEFINITIVE FIX: Conditional Chart Generation ---
+            total_objects = aggs.get('summary', (0, 0))[0]
+            if total_objects <= 0 and kind == 'source':
+                print(f"  --> Skipping chart generation for '{source}' as it contains no objects.")
+                prefix = None
+
+            batch.append(({'title': title, 'aggs': aggs, 'charts': {}}, prefix))
+            batch.extend(subsections)
+            while len(batch) >= options.chart_workers or (batch and step == total_steps):
+                write_sections(batch[:options.chart_workers], chart_generator, pdf_generator, options.chart_workers)
+                batch = batch[options.chart_workers:]
+
+        if exporter:
+            final_path = exporter.export_dir
+            print(f"\nWrote the export index to {exporter.finish()}.")
+        else:
+            print("\nWriting PDF document...")
+            output_start = time.perf_counter()
+            pdf_generator.finish_report()
+            final_path = pdf_generator.get_final_path()
+            print(f"  --> Wrote {format_bytes(final_path.stat().st_size)} in {time.perf_counter() - output_start:.2f}s.")
+    finally:
+        if pdf_generator:
+            pdf_generator.close()
+        if chart_generator:
+            chart_generator.close()
+        if borrowed:
+            # The connection goes back to its owner without this run's cache file attached or profiling turned on.
+            if cache:
+                cache.close()
+            if profiler:
+                profiler.unwatch(con)
+        else:
+            con.close()
+
+    elapsed = time.time() - start_time
+    if cache:
+        print(f"\nAggregate cache: {cache.hits} hit(s), {cache.misses} miss(es).")
+    if warehouse:
+        print(f"Warehouse {options.db}: {warehouse.ingested} source(s) ingested, {warehouse.reused} reused.")
+    if chart_generator and chart_generator.use_cache:
+        print(f"Chart cache: {chart_generator.cache_hits} chart(s) reused.")
+    if profiler:
+        profiler.write(options.profile)
+        print(f"Profile written to: {options.profile}")
+    print(f"\n--- {'Export' if exporter else 'Report Generation'} Complete in {elapsed:.2f} seconds ---")
+    print(f"✅ {'Aggregates exported' if exporter else 'PDF Report saved'} to: {final_path}")
+    return final_path
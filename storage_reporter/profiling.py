@@ -0,0 +1,87 @@
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+import json
+from pathlib import Path
+import resource
+import sys
+import time
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def profile_stage(profiler, stage, **details):
+    """profiler.stage(...) when profiling, otherwise a no-op context that yields a throwaway record."""
+    return profiler.stage(stage, **details) if profiler else nullcontext({})
+
+class Profiler:
+    """Records wall time, CPU time and peak RSS per report stage, plus rows scanned and bytes read for DuckDB queries."""
+
+    def __init__(self, explain=False):
+        # When set, each profiled query also keeps DuckDB's EXPLAIN ANALYZE tree.
+        self.explain = explain
+        self.stages = []
+        self.started = datetime.now()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    @staticmethod
+    def watch(con):
+        """Turns on DuckDB's profiler for `con` without printing, so add_query_metrics can read it back."""
+        con.execute("SET enable_profiling = 'no_output'")
+        return con
+
+    @staticmethod
+    def unwatch(con):
+        con.execute("RESET enable_profiling")
+
+    @contextmanager
+    def stage(self, stage, **details):
+        record = {'stage': stage, **details}
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = round(time.perf_counter() - wall, 6)
+            record['cpu_s'] = round(time.process_time() - cpu, 6)
+            record['peak_rss_bytes'] = peak_rss_bytes()
+            self.stages.append(record)
+
+    def add(self, stage, **measurements):
+        """Adds a stage measured elsewhere, e.g. in a worker process."""
+        self.stages.append({'stage': stage, **measurements})
+
+    def add_query_metrics(self, record, con):
+        """Adds the most recent query's rows scanned and bytes read to `record`; call right after the query."""
+        info = json.loads(con.get_profiling_information(format='json'))
+        record['rows_scanned'] = record.get('rows_scanned', 0) + self._scanned_rows(info)
+        record['bytes_read'] = record.get('bytes_read', 0) + info.get('total_bytes_read', 0)
+        if self.explain:
+            record.setdefault('explain', []).append(con.get_profiling_information(format='query_tree'))
+
+    def write(self, path):
+        """Writes every stage plus per-stage totals as JSON."""
+        totals = {}
+        for record in self.stages:
+            total = totals.setdefault(record['stage'], {'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rows_scanned': 0, 'bytes_read': 0})
+            total['count'] += 1
+            for key in ('wall_s', 'cpu_s', 'rows_scanned', 'bytes_read'):
+                total[key] += record.get(key, 0)
+        report = {
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_s': round(time.perf_counter() - self._start_wall, 6),
+            'cpu_s': round(time.process_time() - self._start_cpu, 6),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'totals': totals,
+            'stages': self.stages,
+        }
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(report, indent=2, default=str))
+
+    @classmethod
+    def _scanned_rows(cls, node):
+        # Rows produced by the file and table scans, which DuckDB's per-operator cardinality reports exactly.
+        own = node.get('operator_cardinality', 0) if node.get('operator_type') == 'TABLE_SCAN' else 0
+        return own + sum(cls._scanned_rows(child) for child in node.get('children', []))
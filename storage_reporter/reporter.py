@@ -1,17 +1,43 @@
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import io
+import multiprocessing
+import os
 from pathlib import Path
+import tempfile
+import time
 from fpdf import FPDF
 from fpdf.enums import XPos, YPos
-from .utils import format_bytes, DynamicExplanations
+from .images import ImageOptimizer, compression_level
+from .profiling import peak_rss_bytes, profile_stage
+from .tables import GlyphWidths, TableRenderer, fitting_font_size
+from .utils import column, column_names, detached, format_bytes, format_bytes_array, format_signed_bytes, num_rows, DynamicExplanations
 
 class PDF(FPDF):
-    def __init__(self, config, **kwargs):
+    # page_numbers: 'draw' puts 'Page N' in the footer; 'skip' leaves it out of section parts rendered on their own,
+    # whose numbers are only known once they are merged; 'only' draws nothing else, to stamp the numbers onto them.
+    def __init__(self, config, has_cover=True, page_numbers='draw', **kwargs):
         super().__init__(**kwargs)
         self.config = config
+        self.images = ImageOptimizer.from_config(config)
+        self.has_cover = has_cover
+        self.page_numbers = page_numbers
+
+    # fpdf2 compresses images as they are added and page content on output, at the configured level.
+    def image(self, *args, **kwargs):
+        with compression_level(self.config['pdf_compression_level']):
+            return super().image(*args, **kwargs)
+
+    def output(self, *args, **kwargs):
+        with compression_level(self.config['pdf_compression_level']):
+            return super().output(*args, **kwargs)
+
+    def on_cover(self):
+        return self.has_cover and self.page_no() == 1
 
     # --- DEFINITIVE FIX FOR HEADER ALIGNMENT ---
     def header(self):
-        if not self.config['header_enabled'] or self.page_no() == 1:
+        if not self.config['header_enabled'] or self.on_cover() or self.page_numbers == 'only':
             return
 
         self.set_font('Helvetica', '', 8)
@@ -25,7 +51,7 @@ class PDF(FPDF):
         if layout == 'multi-line':
             self.set_y(y_start)
             if logo_path and Path(logo_path).exists():
-                self.image(logo_path, x=10, y=y_start, h=9)
+                self.image(self.images.prepare(logo_path, h=9), x=10, y=y_start, h=9)
                 self.set_y(y_start + 9 + 2) # Position cursor below logo
 
             self.cell(w=0, h=5, text=self.config.get('header_text', ''), align=self.config.get('header_text_align', 'L'), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
@@ -38,7 +64,7 @@ class PDF(FPDF):
 
             text_start_x = self.l_margin
             if logo_path and Path(logo_path).exists():
-                self.image(logo_path, x=10, y=y_start, h=9)
+                self.image(self.images.prepare(logo_path, h=9), x=10, y=y_start, h=9)
                 text_start_x = 30 # Indent text to the right of the logo
 
             text_parts = [self.config.get('header_text'), self.config.get('header_phone')]
@@ -65,55 +91,102 @@ class PDF(FPDF):
         self.set_y(final_y + 3)
 
     def footer(self):
+        number = self.page_numbers != 'skip'
+        decorate = self.page_numbers != 'only'
         # Draw the standard footer content first
-        if self.config['footer_enabled'] and self.page_no() > 1:
+        if self.config['footer_enabled'] and not self.on_cover():
             with self.local_context():
                 self.set_y(-20)
                 layout, logo_path = self.config.get('footer_layout', 'single-line'), self.config.get('footer_logo')
                 if layout == 'multi-line':
                     if logo_path and Path(logo_path).exists(): 
-                        self.image(logo_path, x=self.w / 2 - 10, y=self.get_y(), h=7)
+                        if decorate:
+                            self.image(self.images.prepare(logo_path, h=7), x=self.w / 2 - 10, y=self.get_y(), h=7)
                         self.ln(8)
                     self.set_font('Helvetica', 'I', 8)
                     self.set_text_color(128)
-                    self.cell(w=0, h=5, text=f'Page {self.page_no()}', align=self.config.get('footer_page_num_align', 'C'), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-                    self.set_font('Helvetica', '', 8)
-                    self.set_text_color(0,0,0)
-                    self.cell(w=0, h=5, text=self.config.get('footer_text', ''), align=self.config.get('footer_text_align', 'C'), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+                    self.cell(w=0, h=5, text=f'Page {self.page_no()}' if number else '', align=self.config.get('footer_page_num_align', 'C'), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+                    if decorate:
+                        self.set_font('Helvetica', '', 8)
+                        self.set_text_color(0,0,0)
+                        self.cell(w=0, h=5, text=self.config.get('footer_text', ''), align=self.config.get('footer_text_align', 'C'), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
                 else:
-                    if logo_path and Path(logo_path).exists(): self.image(logo_path, x=10, y=self.get_y() + 2, h=5)
+                    if decorate and logo_path and Path(logo_path).exists(): self.image(self.images.prepare(logo_path, h=5), x=10, y=self.get_y() + 2, h=5)
                     self.set_y(-15)
                     self.set_font('Helvetica', 'I', 8)
                     self.set_text_color(128)
-                    self.cell(w=0, h=10, text=f'Page {self.page_no()}', border=0, align=self.config.get('footer_page_num_align', 'C'))
-                    if self.config.get('footer_text'):
+                    if number:
+                        self.cell(w=0, h=10, text=f'Page {self.page_no()}', border=0, align=self.config.get('footer_page_num_align', 'C'))
+                    if decorate and self.config.get('footer_text'):
                         self.set_y(-15)
                         self.set_font('Helvetica', '', 8)
                         self.set_text_color(0,0,0)
                         self.cell(w=0, h=10, text=self.config.get('footer_text'), border=0, align=self.config.get('footer_text_align', 'R'))
 
         # Draw the watermark last, so it's on top of all page content.
-        if self.page_no() > 1 and self.config['draft_watermark_enabled']:
+        if decorate and not self.on_cover() and self.config['draft_watermark_enabled']:
             with self.local_context():
                 self.set_font('Helvetica', 'B', 50)
                 self.set_text_color(*self.config['draft_watermark_color'])
                 self.rotate(45, x=self.w/2, y=self.h/2)
                 self.text(x=self.w/2 - self.get_string_width(self.config['draft_watermark_text'])/2, y=self.h/2 + 20, text=self.config['draft_watermark_text'])
 
+def _render_section_part(config, output_path, title, aggs, chart_paths, level):
+    """Lays out one section as a standalone PDF without page numbers; returns its page count and the worker-side
+    timings for --profile."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    generator = PDFReportGenerator(config, [], Path(output_path).parent, part=True)
+    generator.add_section(title, aggs, chart_paths, level)
+    generator.pdf.output(output_path)
+    return generator.pdf.page_no(), {'wall_s': round(time.perf_counter() - wall, 6), 'cpu_s': round(time.process_time() - cpu, 6),
+                                     'peak_rss_bytes': peak_rss_bytes(), 'worker_pid': os.getpid()}
+
 # ... (The rest of the reporter.py file is unchanged) ...
 class PDFReportGenerator:
-    def __init__(self, config, report_sections, output_dir): 
+    # part: the generator lays out a single section for ParallelPDFReportGenerator to merge, so its document has no
+    # cover and leaves page numbers to be stamped once the final numbering is known.
+    def __init__(self, config, report_sections, output_dir, profiler=None, part=False): 
         self.config, self.report_sections, self.output_dir = config, report_sections, output_dir
-        self.pdf = PDF(config)
+        self.profiler = profiler
+        self.pdf = PDF(config, has_cover=not part, page_numbers='skip' if part else 'draw')
+        if part:
+            self.pdf.set_auto_page_break(True, margin=15)
+        self.glyphs = GlyphWidths()
+        self.tables = TableRenderer(self.pdf, self.glyphs)
+        self.toc_links = []
+        # (page, x, y, w, h) of each table of contents entry's link, in mm.
+        self.toc_entries = []
+        self.sections_written = 0
     def create_report(self):
+        self.begin_report([section['title'] for section in self.report_sections])
+        for section in self.report_sections: 
+            self.add_section(section['title'], section['aggs'], section['charts'])
+        self.finish_report()
+    def begin_report(self, section_titles):
+        """Writes the cover and reserves the table of contents; sections must then be added in the same order."""
         self._add_cover_page()
-        toc_links = [(section['title'], self.pdf.add_link()) for section in self.report_sections]
-        self._add_table_of_contents_page(toc_links)
-        for i, section in enumerate(self.report_sections): 
+        self.toc_links = [(title, self.pdf.add_link()) for title in section_titles]
+        self._add_table_of_contents_page(self.toc_links)
+    def add_section(self, title, aggs, chart_paths, level=0):
+        """Lays out one section and returns its page count; nothing is kept afterwards, so callers can release its
+        aggregates and charts. Level 1 sections (project drill-downs) nest in the outline under the level 0 section
+        before them and have no table of contents entry of their own."""
+        with profile_stage(self.profiler, 'pdf_section', name=title) as record:
+            first_page = self.pdf.page_no() + 1
             self.pdf.add_page()
-            self.pdf.set_link(toc_links[i][1], page=self.pdf.page_no())
-            self._add_section_content_to_pdf(section['title'], section['aggs'], section['charts'])
-        self.pdf.output(self.get_final_path())
+            if self.toc_links and level == 0:
+                self.pdf.set_link(self.toc_links[self.sections_written][1], page=self.pdf.page_no())
+            self._add_section_content_to_pdf(title, aggs, chart_paths, level)
+            if level == 0:
+                self.sections_written += 1
+            record['pages'] = self.pdf.page_no() - first_page + 1
+        return record['pages']
+    def finish_report(self):
+        with profile_stage(self.profiler, 'pdf_output') as record:
+            self.pdf.output(self.get_final_path())
+            record['bytes_written'] = self.get_final_path().stat().st_size
+    def close(self):
+        """Releases worker processes and scratch files; a serial report holds none."""
     def get_final_path(self): 
         return self.output_dir / "Storage_Analysis_Report.pdf"
     def _add_cover_page(self):
@@ -123,7 +196,7 @@ class PDFReportGenerator:
             self.pdf.set_fill_color(*self.config['cover_bg_color'])
             self.pdf.rect(0, 0, 210, 297, 'F')
         if self.config['cover_bg_image'] and Path(self.config['cover_bg_image']).exists(): 
-            self.pdf.image(self.config['cover_bg_image'], x=0, y=0, w=210)
+            self.pdf.image(self.pdf.images.prepare(self.config['cover_bg_image'], w=210), x=0, y=0, w=210)
         self.pdf.set_y(60)
         self.pdf.set_font(*self.config['cover_title_font'])
         self.pdf.set_text_color(*self.config['cover_title_color'])
@@ -146,18 +219,92 @@ class PDFReportGenerator:
         self.pdf.set_text_color(*self.config['toc_entry_color'])
         for title, link in toc_links: 
             self.pdf.cell(w=0, h=10, text=title, align='L', link=link, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-    def _add_section_content_to_pdf(self, title, aggs, chart_paths):
-        self.pdf.start_section(title, level=0)
+            # Where fpdf puts a cell's link: over the text only. Read back after the cell, which may start a new page.
+            font_size = self.pdf.font_size
+            self.toc_entries.append((self.pdf.page_no(), self.pdf.l_margin + self.pdf.c_margin, self.pdf.get_y() - 5 - font_size / 2,
+                                     self.pdf.get_string_width(title), font_size))
+    def _add_section_content_to_pdf(self, title, aggs, chart_paths, level=0):
+        self.pdf.start_section(title, level=level)
         self._write_dynamic_title(title, self.config['section_title_font'], self.config['section_title_color'], self.config['section_title_justification'])
+        if 'change_summary' in aggs:
+            self._add_changes_content_to_pdf(aggs)
+        elif 'drilldown_projects' in aggs:
+            self._add_drilldown_index_to_pdf(aggs)
+        elif 'project' in aggs:
+            self._add_project_content_to_pdf(aggs)
+        elif 'summary' in aggs:
+            self._add_inventory_content_to_pdf(aggs)
+        else:
+            self._add_appendix_content_to_pdf(aggs)
+        if chart_paths:
+            self._add_charts_to_pdf(title, aggs, chart_paths)
+    def _add_inventory_content_to_pdf(self, aggs):
         total_objects, total_size = aggs['summary']
-        summary_data = [["Metric", "Value"], ["Total Objects", f"{total_objects:,}"], ["Total Storage", format_bytes(total_size)], ["Avg Object Size", format_bytes(total_size/total_objects if total_objects > 0 else 0)]]
+        estimate = aggs.get('estimate')
+        if estimate:
+            summary_data = self._estimated_summary_rows(total_objects, total_size, estimate)
+        else:
+            summary_data = [["Metric", "Value"], ["Total Objects", f"{total_objects:,}"], ["Total Storage", format_bytes(total_size)], ["Avg Object Size", format_bytes(total_size/total_objects if total_objects > 0 else 0)]]
+        if aggs.get('rejected_rows'):
+            summary_data.append(["Rejected Rows", f"{aggs['rejected_rows']:,}"])
+        if aggs.get('duplicates_removed') is not None:
+            summary_data.append(["Duplicates Removed", f"{aggs['duplicates_removed']:,}"])
         self._write_table_to_pdf("Overall Summary", summary_data)
-        df_projects = aggs['top_projects'].copy()
-        df_projects['total_size'] = df_projects['total_size'].apply(format_bytes)
-        self._write_df_to_pdf("Top 10 Projects by Size", df_projects)
-        df_buckets = aggs['top_buckets'].copy()
-        df_buckets['total_size'] = df_buckets['total_size'].apply(format_bytes)
-        self._write_df_to_pdf("Top 10 Buckets by Size", df_buckets)
+        if estimate:
+            self.pdf.set_font(*self.config['body_font'])
+            self.pdf.set_text_color(*self.config['body_color'])
+            self.pdf.multi_cell(w=0, h=5, text=f"All figures in this section are estimated from a {estimate['sample_percent']:g}% random sample of objects. "
+                                "± gives the 95% confidence margin; percentiles are accurate to about 9%.", align=self.config['body_justification'])
+            self.pdf.ln(5)
+        self._write_df_to_pdf("Top 10 Projects by Size", aggs['top_projects'], {'total_size': format_bytes_array})
+        self._write_df_to_pdf("Top 10 Buckets by Size", aggs['top_buckets'], {'total_size': format_bytes_array})
+    def _add_changes_content_to_pdf(self, aggs):
+        summary = aggs['change_summary']
+        summary_data = [["Change", "Objects", "Size Change"]]
+        counts, deltas = column(summary, 'object_count').tolist(), column(summary, 'size_delta').tolist()
+        summary_data += [[change.title(), f"{count:,}", format_signed_bytes(delta)] for change, count, delta in zip(column(summary, 'change').tolist(), counts, deltas)]
+        added, deleted = counts[0], counts[1]
+        summary_data.append(["Net", f"{added - deleted:+,}", format_signed_bytes(sum(deltas))])
+        self._write_table_to_pdf("Change Summary", summary_data)
+        for key, title in (('project_changes', "Projects with the Largest Changes"), ('bucket_changes', "Buckets with the Largest Changes")):
+            self._write_df_to_pdf(title, aggs[key], {'net_size_delta': lambda values: [format_signed_bytes(v) for v in values.tolist()]})
+    def _add_drilldown_index_to_pdf(self, aggs):
+        """Introduces the project drill-downs that follow and lists the projects that got one."""
+        df = aggs['drilldown_projects']
+        projects = num_rows(df)
+        min_percent, max_projects = aggs['drilldown_min_percent'], aggs['drilldown_max_projects']
+        if not projects:
+            text = f"No project holds at least {min_percent:g}% of all storage, so there are no project drill-downs."
+        else:
+            text = (f"The {projects:,} project(s) below hold at least {min_percent:g}% of all storage each. Every one of them has a "
+                    "drill-down section of its own with its largest buckets, its file size distribution and its storage growth.")
+            if max_projects and projects == max_projects:
+                text += f" Only the largest {max_projects:,} projects above the threshold are included."
+        self.pdf.set_font(*self.config['body_font'])
+        self.pdf.set_text_color(*self.config['body_color'])
+        self.pdf.multi_cell(w=0, h=5, text=text, align=self.config['body_justification'])
+        self.pdf.ln(5)
+        if projects:
+            columns = [column(df, 'project_id').astype(str).tolist(), [f"{count:,}" for count in column(df, 'object_count').tolist()],
+                       format_bytes_array(column(df, 'total_size')), [f"{share:.1f}%" for share in column(df, 'share').tolist()]]
+            self._write_columns_to_pdf("Projects with a Drill-down", ['project_id', 'object_count', 'total_size', 'share'], columns)
+    def _add_project_content_to_pdf(self, aggs):
+        total_objects, total_size = aggs['summary']
+        summary_data = [["Metric", "Value"], ["Total Objects", f"{total_objects:,}"], ["Total Storage", format_bytes(total_size)],
+                        ["Avg Object Size", format_bytes(total_size/total_objects if total_objects > 0 else 0)],
+                        ["Share of All Storage", f"{aggs['share']:.1f}%"]]
+        self._write_table_to_pdf("Project Summary", summary_data)
+        self._write_df_to_pdf("Top 10 Buckets by Size", aggs['top_buckets'], {'total_size': format_bytes_array})
+    def _add_appendix_content_to_pdf(self, aggs):
+        """Lists every project and bucket of the overall analysis, however many there are, in compact rows."""
+        for key, title in (('project_listing', "All Projects by Size"), ('bucket_listing', "All Buckets by Size")):
+            df = aggs[key]
+            if not num_rows(df):
+                continue
+            name_col = column_names(df)[0]
+            columns = [column(df, name_col).astype(str).tolist(), [f"{count:,}" for count in column(df, 'object_count').tolist()], format_bytes_array(column(df, 'total_size'))]
+            self._write_columns_to_pdf(title, [name_col, 'object_count', 'total_size'], columns, font_size=8, row_height=6)
+    def _add_charts_to_pdf(self, title, aggs, chart_paths):
         explanations = DynamicExplanations(aggs, title).get_all()
         for chart_title, chart_path in chart_paths.items():
             if self.pdf.get_y() + 120 > self.pdf.h - self.pdf.b_margin: 
@@ -168,46 +315,143 @@ class PDFReportGenerator:
             self.pdf.set_text_color(*self.config['body_color'])
             self.pdf.multi_cell(w=0, h=5, text=explanation, align=self.config['body_justification'])
             self.pdf.ln(5)
-            self.pdf.image(chart_path, w=self.pdf.w - 40)
+            # Each chart is drawn once, so it is not kept once it is on the page.
+            self.pdf.image(self.pdf.images.prepare(chart_path, w=self.pdf.w - 40, cache=False), w=self.pdf.w - 40)
             self.pdf.ln(5)
+    def _estimated_summary_rows(self, total_objects, total_size, estimate):
+        percentiles = estimate['size_percentiles']
+        rows = [["Metric", "Value"],
+                ["Total Objects (est.)", f"{total_objects:,} ± {estimate['objects_margin']:,.0f}"],
+                ["Total Storage (est.)", f"{format_bytes(total_size)} ± {format_bytes(estimate['size_margin'])}"],
+                ["Avg Object Size (est.)", format_bytes(total_size/total_objects if total_objects > 0 else 0)],
+                ["Projects in Sample", f"{estimate['distinct_projects']:,}"],
+                ["Buckets in Sample", f"{estimate['distinct_buckets']:,}"]]
+        for percent, label in ((50, "Median"), (95, "95th Percentile"), (99, "99th Percentile")):
+            if percentiles[percent] is not None:
+                rows.append([f"{label} Object Size (est.)", format_bytes(percentiles[percent])])
+        return rows
     def _write_dynamic_title(self, title, font_config, color_config, justification, h=10):
         original_family, original_style, original_size = font_config
         self.pdf.set_text_color(*color_config)
         available_width = self.pdf.w - self.pdf.l_margin - self.pdf.r_margin
         words = title.split(' ')
         longest_word = max(words, key=len) if words else ""
-        current_font_size = original_size
-        while current_font_size > 6:
-            self.pdf.set_font(original_family, original_style, current_font_size)
-            if self.pdf.get_string_width(longest_word) < available_width: 
-                break
-            current_font_size -= 1
+        # Shrinks the font until the longest word fits on one line, so multi_cell never has to split a word.
+        font_size = fitting_font_size(self.glyphs, longest_word, original_family, original_style, original_size, available_width)
+        self.pdf.set_font(original_family, original_style, font_size)
         self.pdf.multi_cell(w=available_width, h=h, text=title, align=justification)
         self.pdf.ln(5)
         self.pdf.set_font(original_family, original_style, original_size)
     def _write_table_to_pdf(self, title, data):
-        self._write_dynamic_title(title, self.config['table_title_font'], self.config['table_title_color'], self.config['table_title_justification'], h=15)
-        if not data or len(data) < 2: 
+        if not data or len(data) < 2:
+            self._write_dynamic_title(title, self.config['table_title_font'], self.config['table_title_color'], self.config['table_title_justification'], h=15)
             return
-        self.pdf.set_font('Helvetica', 'B', 10)
-        self.pdf.set_text_color(0,0,0)
-        col_widths = self._get_col_widths(data)
-        for i, h in enumerate(data[0]): 
-            self.pdf.cell(w=col_widths[i], h=10, text=str(h), border=1, align='C', new_x=XPos.RIGHT, new_y=YPos.TOP)
-        self.pdf.ln()
-        self.pdf.set_font('Helvetica', '', 10)
-        for row in data[1:]:
-            for i, item in enumerate(row):
-                style = self.config['bucket_name_style'] if "Buckets" in title and i == 0 else ""
-                self.pdf.set_font('Helvetica', style, 10)
-                self.pdf.cell(w=col_widths[i], h=10, text=str(item), border=1, align=self.config['body_justification'], new_x=XPos.RIGHT, new_y=YPos.TOP)
-            self.pdf.ln()
+        self._write_columns_to_pdf(title, data[0], [[str(item) for item in column] for column in zip(*data[1:])])
+    def _write_df_to_pdf(self, title, df, formatters=None):
+        """Writes a pandas DataFrame, pyarrow Table or dict of NumPy arrays as a table; `formatters` maps a column name
+        to a function turning its NumPy array into strings, the rest are written with str()."""
+        if not num_rows(df):
+            return
+        formatters = formatters or {}
+        names = column_names(df)
+        columns = [formatters[c](column(df, c)) if c in formatters else column(df, c).astype(str).tolist() for c in names]
+        self._write_columns_to_pdf(title, names, columns)
+    def _write_columns_to_pdf(self, title, header, columns, font_size=10, row_height=10):
+        """Writes a titled table from column-major lists of strings; headers repeat on every page it spans."""
+        self._write_dynamic_title(title, self.config['table_title_font'], self.config['table_title_color'], self.config['table_title_justification'], h=15)
+        styles = [self.config['bucket_name_style'] if "Buckets" in title and i == 0 else "" for i in range(len(columns))]
+        self.tables.write([str(h) for h in header], columns, font_size=font_size, row_height=row_height, align=self.config['body_justification'], column_styles=styles)
         self.pdf.ln(10)
-    def _get_col_widths(self, data):
-        max_widths = [max(self.pdf.get_string_width(str(cell)) for cell in col) for col in zip(*data)]
-        total_width = sum(max_widths) + len(max_widths) * 4
-        available_width = self.pdf.w - 40
-        scale = available_width / total_width if total_width > available_width else 1.0
-        return [(w + 4) * scale for w in max_widths]
-    def _write_df_to_pdf(self, title, df):
-        if not df.empty: self._write_table_to_pdf(title, [df.columns.tolist()] + df.values.tolist())
\ No newline at end of file
+class ParallelPDFReportGenerator(PDFReportGenerator):
+    """Lays out sections in worker processes, each to its own PDF, and merges them behind the cover and table of
+    contents when the report is finished.
+
+    A part cannot know on which page it will start, so parts are laid out without page numbers; the merge stamps
+    the final numbers onto them, points the table of contents entries at each part's first page and builds the
+    outline from the parts' own section entries. Needs pypdf.
+    """
+
+    def __init__(self, config, report_sections, output_dir, profiler=None, workers=2):
+        super().__init__(config, report_sections, output_dir, profiler=profiler)
+        self.workers = workers
+        self._pool = None
+        self._parts_dir = None
+        self._parts = []
+
+    def begin_report(self, section_titles):
+        """Writes the cover and the table of contents, whose links are added once the parts' pages are known."""
+        self._add_cover_page()
+        self.toc_links = [(title, None) for title in section_titles]
+        self._add_table_of_contents_page(self.toc_links)
+        self._parts_dir = tempfile.TemporaryDirectory(prefix="pdf_parts_", dir=self.output_dir)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def add_section(self, title, aggs, chart_paths, level=0):
+        """Queues the section for a worker; returns None as its pages are only known once finish_report merges it."""
+        path = Path(self._parts_dir.name) / f"section_{len(self._parts):05d}.pdf"
+        self._parts.append((title, level, path, self._pool.submit(_render_section_part, self.config, str(path), title, detached(aggs), chart_paths, level)))
+        if level == 0:
+            self.sections_written += 1
+
+    def finish_report(self):
+        from pypdf import PdfReader, PdfWriter
+        from pypdf.annotations import Link
+        from pypdf.generic import Fit
+        writer = PdfWriter()
+        writer.append(PdfReader(io.BytesIO(self.pdf.output())), import_outline=False)
+        front_pages = len(writer.pages)
+        first_pages, parent = [], None
+        for title, level, path, future in self._parts:
+            pages, timing = future.result()
+            print(f"  --> Laid out '{title}' in a worker in {timing['wall_s']:.2f}s ({pages} page(s)).")
+            if self.profiler:
+                self.profiler.add('pdf_section', name=title, pages=pages, worker=True, **timing)
+            part = PdfReader(path)
+            # The part's outline holds its own section entry; it is re-added at the part's place, nested by level.
+            dest = part.outline[0]
+            start = len(writer.pages)
+            writer.append(part, import_outline=False)
+            item = writer.add_outline_item(title, start, parent=parent if level else None, fit=Fit.xyz(dest.left, dest.top, dest.zoom))
+            if level == 0:
+                first_pages.append(start)
+                parent = item
+        self.close()
+        with profile_stage(self.profiler, 'pdf_output') as record:
+            for (page, x, y, w, h), target in zip(self.toc_entries, first_pages):
+                writer.add_annotation(page - 1, Link(rect=self._pdf_rect(x, y, w, h), target_page_index=target))
+            if self.config['footer_enabled'] and len(writer.pages) > front_pages:
+                self._stamp_page_numbers(writer, front_pages)
+            # Each part embeds its own copy of shared objects such as fonts and the logo; keep one of each.
+            writer.compress_identical_objects()
+            with open(self.get_final_path(), 'wb') as f:
+                writer.write(f)
+            record['bytes_written'] = self.get_final_path().stat().st_size
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._parts_dir is not None:
+            self._parts_dir.cleanup()
+            self._parts_dir = None
+
+    def _pdf_rect(self, x, y, w, h):
+        # fpdf measures in mm from the top of the page; PDF rectangles are in points from the bottom.
+        k, page_h = self.pdf.k, self.pdf.h
+        return (x * k, (page_h - y - h) * k, (x + w) * k, (page_h - y) * k)
+
+    def _stamp_page_numbers(self, writer, first_index):
+        """Draws 'Page N' on every merged section page with the same footer code, in a document of blank pages that
+        are merged over the section pages. merge_page renames the stamp's fonts where they clash with the page's own
+        and wraps both contents in their own graphics state, so neither can affect the other."""
+        from pypdf import PdfReader
+        stamp = PDF(self.config, page_numbers='only')
+        stamp.set_auto_page_break(False)
+        for _ in range(len(writer.pages)):
+            stamp.add_page()
+        stamp_pages = PdfReader(io.BytesIO(stamp.output())).pages
+        for index in range(first_index, len(writer.pages)):
+            page = writer.pages[index]
+            page.merge_page(stamp_pages[index])
+            # merge_page leaves the combined content decoded.
+            page.compress_content_streams()
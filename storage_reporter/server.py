@@ -0,0 +1,163 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import multiprocessing
+from pathlib import Path
+import threading
+import time
+from storage_reporter.pipeline import ReportOptions, run_report
+
+_worker_config = None
+_worker_con = None
+
+def _init_report_worker(base_config):
+    """Runs once per worker process: loads the heavy libraries, applies the chart style, warms matplotlib's font cache
+    and opens the DuckDB connection that every job on this worker runs on."""
+    global _worker_config, _worker_con
+    _worker_config = base_config
+    import matplotlib.pyplot as plt
+    from storage_reporter.analyzer import create_connection
+    plt.switch_backend('Agg')
+    plt.style.use(base_config['chart_style'])
+    fig, ax = plt.subplots()
+    ax.set_title("warm-up")
+    fig.canvas.draw()
+    plt.close(fig)
+    _worker_con = create_connection(1)
+
+def _run_report_job(job):
+    config = dict(_worker_config)
+    config.update(job['config'])
+    config['csv_files'] = job['files']
+    start = time.time()
+    report_path = run_report(config, Path(job['outdir']), ReportOptions(**job['options']), con=_worker_con)
+    return {'report': str(report_path), 'seconds': round(time.time() - start, 3)}
+
+class ReportServer:
+    """Accepts report jobs and runs them on a fixed pool of warm worker processes, one job per process at a time.
+
+    Jobs that write to the same output directory run one after another, since they share its caches and report file.
+    """
+
+    def __init__(self, base_config, max_jobs=2):
+        self.base_config = base_config
+        # 'spawn' keeps workers free of the server's threads; each one pays the import cost once, up front.
+        self.pool = ProcessPoolExecutor(max_workers=max_jobs, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_report_worker, initargs=(base_config,))
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._busy_outdirs = set()
+        self._waiting = {}
+
+    def submit(self, payload):
+        """Validates a job request and queues it; raises ValueError for a malformed one."""
+        files = payload.get('files')
+        if not files or not isinstance(files, list):
+            raise ValueError("'files' must be a non-empty list of input paths")
+        missing = [f for f in files if not Path(f).exists()]
+        if missing:
+            raise ValueError(f"input files not found: {', '.join(missing)}")
+        overrides = payload.get('config', {})
+        unknown = sorted(set(overrides) - set(self.base_config) - {'author', 'version'})
+        if unknown:
+            raise ValueError(f"unknown config keys: {', '.join(unknown)}")
+        try:
+            ReportOptions(**payload.get('options', {}))
+        except TypeError as e:
+            raise ValueError(f"invalid options: {e}") from e
+        job = {'files': files, 'outdir': str(Path(payload.get('outdir', 'storage_pdf_report')).resolve()),
+               'config': overrides, 'options': payload.get('options', {})}
+        with self._lock:
+            job_id = str(next(self._ids))
+            self.jobs[job_id] = {'id': job_id, 'status': 'queued', 'submitted': time.time(), 'done': threading.Event()}
+            if job['outdir'] in self._busy_outdirs:
+                self._waiting.setdefault(job['outdir'], deque()).append((job_id, job))
+                return job_id
+            self._busy_outdirs.add(job['outdir'])
+        self._start(job_id, job)
+        return job_id
+
+    def status(self, job_id):
+        record = self.jobs.get(job_id)
+        return None if record is None else {k: v for k, v in record.items() if k != 'done'}
+
+    def wait(self, job_id, timeout=None):
+        self.jobs[job_id]['done'].wait(timeout)
+        return self.status(job_id)
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def _start(self, job_id, job):
+        self.jobs[job_id]['status'] = 'running'
+        future = self.pool.submit(_run_report_job, job)
+        future.add_done_callback(lambda f: self._finish(job_id, job, f))
+
+    def _finish(self, job_id, job, future):
+        record = self.jobs[job_id]
+        error = future.exception()
+        if error is None:
+            record.update(status='done', **future.result())
+        else:
+            record.update(status='failed', error=f"{type(error).__name__}: {error}")
+        with self._lock:
+            queue = self._waiting.get(job['outdir'])
+            next_job = queue.popleft() if queue else None
+            if next_job is None:
+                self._busy_outdirs.discard(job['outdir'])
+                self._waiting.pop(job['outdir'], None)
+        record['done'].set()
+        if next_job is not None:
+            self._start(*next_job)
+
+class _ReportRequestHandler(BaseHTTPRequestHandler):
+    # POST /jobs {"files": [...], "outdir": "...", "config": {...}, "options": {...}, "wait": false}
+    # GET /jobs/<id> and GET /health
+    server_version = "StorageReporter/1.0"
+
+    def do_GET(self):
+        report_server = self.server.report_server
+        if self.path == '/health':
+            return self._reply(200, {'status': 'ok', 'jobs': len(report_server.jobs)})
+        if self.path.startswith('/jobs/'):
+            status = report_server.status(self.path.removeprefix('/jobs/'))
+            return self._reply(200, status) if status else self._reply(404, {'error': 'no such job'})
+        self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/jobs':
+            return self._reply(404, {'error': 'not found'})
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            job_id = self.server.report_server.submit(payload)
+        except (ValueError, AttributeError) as e:
+            return self._reply(400, {'error': str(e)})
+        if payload.get('wait'):
+            status = self.server.report_server.wait(job_id)
+            return self._reply(200 if status['status'] == 'done' else 500, status)
+        self._reply(202, self.server.report_server.status(job_id))
+
+    def _reply(self, code, body):
+        data = json.dumps(body, default=str).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def serve(base_config, port=8765, max_jobs=2, host='127.0.0.1'):
+    """Serves report jobs over HTTP on localhost until interrupted."""
+    report_server = ReportServer(base_config, max_jobs=max_jobs)
+    httpd = ThreadingHTTPServer((host, port), _ReportRequestHandler)
+    httpd.report_server = report_server
+    print(f"📡 Report server listening on http://{host}:{port} with {max_jobs} worker process(es).")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        report_server.close()
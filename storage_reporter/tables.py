@@ -0,0 +1,130 @@
+import math
+from fpdf import FPDF
+import numpy as np
+
+class GlyphWidths:
+    """Measures strings from per-character widths that fpdf reports once per font, instead of once per cell.
+
+    Core PDF fonts have no kerning, so a string's width is exactly the sum of its characters' widths. Measuring
+    happens on a private FPDF instance so the report's current font and page stream are never touched.
+    """
+
+    def __init__(self):
+        self._measurer = FPDF()
+        self._fonts = {}
+
+    def width(self, text, family, style, size):
+        chars = self._char_widths(family, style, size)
+        total = 0.0
+        for char in text:
+            char_width = chars.get(char)
+            if char_width is None:
+                self._measurer.set_font(family, style, size)
+                char_width = chars[char] = self._measurer.get_string_width(char)
+            total += char_width
+        return total
+
+    def widths(self, texts, family, style, size):
+        return [self.width(text, family, style, size) for text in texts]
+
+    def _char_widths(self, family, style, size):
+        return self._fonts.setdefault((family, style, size), {})
+
+class TableRenderer:
+    """Draws bordered tables of any length straight onto a PDF's pages.
+
+    Each cell is one fpdf text() call and the borders are one line per row plus one per column for every page, where
+    fpdf's cell() would add a bordered box per cell. Rows are laid out a page at a time: the header is repeated at the
+    top of every page, and each column is written in one pass so the font changes at most twice per column per page.
+    """
+
+    # Columns are sized from the header plus this many of their longest strings, measured exactly; character count
+    # picks the candidates, so widths are the true maxima except for unusually wide glyph mixes.
+    WIDTH_CANDIDATES = 200
+    CELL_PADDING = 2
+
+    def __init__(self, pdf, glyphs=None, family='Helvetica'):
+        self.pdf = pdf
+        self.glyphs = glyphs or GlyphWidths()
+        self.family = family
+
+    def write(self, header, columns, font_size=10, row_height=10, align='L', column_styles=None, max_width=None):
+        """Writes `header` and the column-major `columns` (sequences of strings of equal length) at the cursor and
+        leaves the cursor below the table. `column_styles` gives each column's body font style ('' by default)."""
+        if not columns or len(columns[0]) == 0:
+            return
+        pdf = self.pdf
+        column_styles = column_styles or [''] * len(columns)
+        widths = self.column_widths(header, columns, font_size, column_styles, max_width or pdf.w - 40)
+        edges = [pdf.l_margin]
+        for w in widths:
+            edges.append(edges[-1] + w)
+        num_rows, start = len(columns[0]), 0
+        pdf.set_text_color(0, 0, 0)
+        while start < num_rows:
+            rows_fit = int((pdf.page_break_trigger - pdf.get_y()) // row_height) - 1
+            if rows_fit < 1:
+                pdf.add_page()
+                continue
+            end = min(num_rows, start + rows_fit)
+            top = pdf.get_y()
+            self._write_row(header, edges, top, row_height, font_size, 'B', align='C')
+            for i, column in enumerate(columns):
+                self._write_column(column[start:end], edges[i], edges[i + 1], top + row_height, row_height, font_size, column_styles[i], align)
+            bottom = top + (end - start + 1) * row_height
+            for y in np.arange(top, bottom + row_height / 2, row_height).tolist():
+                pdf.line(edges[0], y, edges[-1], y)
+            for x in edges:
+                pdf.line(x, top, x, bottom)
+            pdf.set_y(bottom)
+            start = end
+            if start < num_rows:
+                pdf.add_page()
+
+    def column_widths(self, header, columns, font_size, column_styles, max_width):
+        """Widest header or body string of each column plus padding, scaled down together to fit `max_width`."""
+        widths = []
+        for label, column, style in zip(header, columns, column_styles):
+            lengths = np.fromiter((len(text) for text in column), dtype=np.int64, count=len(column))
+            if len(column) > self.WIDTH_CANDIDATES:
+                candidates = np.argpartition(lengths, -self.WIDTH_CANDIDATES)[-self.WIDTH_CANDIDATES:].tolist()
+            else:
+                candidates = range(len(column))
+            body = max(self.glyphs.widths((column[i] for i in candidates), self.family, style, font_size), default=0.0)
+            widths.append(max(body, self.glyphs.width(str(label), self.family, 'B', font_size)))
+        total_width = sum(widths) + len(widths) * self.CELL_PADDING * 2
+        scale = max_width / total_width if total_width > max_width else 1.0
+        return [(w + self.CELL_PADDING * 2) * scale for w in widths]
+
+    def _write_row(self, texts, edges, top, row_height, font_size, style, align):
+        self.pdf.set_font(self.family, style, font_size)
+        baseline = self._baseline(top, row_height, font_size)
+        for i, text in enumerate(texts):
+            self.pdf.text(self._text_x(str(text), edges[i], edges[i + 1], font_size, style, align), baseline, str(text))
+
+    def _write_column(self, texts, left, right, top, row_height, font_size, style, align):
+        pdf = self.pdf
+        pdf.set_font(self.family, style, font_size)
+        baseline = self._baseline(top, row_height, font_size)
+        for row, text in enumerate(texts):
+            pdf.text(self._text_x(text, left, right, font_size, style, align), baseline + row * row_height, text)
+
+    def _baseline(self, top, row_height, font_size):
+        # Same vertical placement as a single-line fpdf cell of height `row_height`.
+        return top + 0.5 * row_height + 0.3 * font_size / self.pdf.k
+
+    def _text_x(self, text, left, right, font_size, style, align):
+        margin = self.pdf.c_margin
+        if align == 'C':
+            return left + (right - left - self.glyphs.width(text, self.family, style, font_size)) / 2
+        if align == 'R':
+            return right - margin - self.glyphs.width(text, self.family, style, font_size)
+        return left + margin
+
+def fitting_font_size(glyphs, text, family, style, size, available_width, min_size=6):
+    """Largest whole font size up to `size` (but at least `min_size`) at which `text` is narrower than
+    `available_width`; widths grow linearly with the size, so one measurement suffices."""
+    width = glyphs.width(text, family, style, size)
+    if width < available_width:
+        return size
+    return max(min_size, min(size, math.ceil(size * available_width / width) - 1))
@@ -0,0 +1,115 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import multiprocessing
+from pathlib import Path
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# Timestamps are UTC but written without an offset: tz-aware CSV formatting is ~10x slower in Arrow.
+INVENTORY_SCHEMA = pa.schema([
+    ("project_id", pa.string()), ("bucket_name", pa.string()), ("object_name", pa.string()), ("size_bytes", pa.int64()),
+    ("content_type", pa.string()), ("creation_time_utc", pa.timestamp('s')), ("updated_time_utc", pa.timestamp('s')),
+])
+CONTENT_TYPES = ['image/jpeg', 'video/mp4', 'text/csv', 'application/zip', 'application/json', 'application/octet-stream', 'image/png', 'application/pdf']
+BUCKET_TIERS = ['hot', 'archive', 'nearline', 'coldline']
+# Keeps lognormal tail draws inside a signed 64-bit size.
+MAX_OBJECT_SIZE = 2**62
+
+@dataclass
+class TestDataSpec:
+    """Shape of the generated fixtures; the same spec and seed always produce the same files."""
+    seed: int = 42
+    file_format: str = "csv"
+    projects: int = 2
+    buckets_per_project: int = 2
+    content_types: int = 2
+    start_date: str = "2022-01-01"
+    date_span_days: int = 730
+    chunk_rows: int = 1_000_000
+
+    def __post_init__(self):
+        for name in ('projects', 'buckets_per_project', 'content_types'):
+            if getattr(self, name) < 1:
+                raise ValueError(f"test data needs at least 1 of {name.replace('_', ' ')}, not {getattr(self, name)}")
+
+def generate_test_files(directory: Path, num_files: int, num_rows: int, spec: TestDataSpec, workers: int = 1):
+    """Writes the empty, dominant-project and `num_files` multi-project fixtures, in parallel across files."""
+    directory.mkdir(parents=True, exist_ok=True)
+    ext = spec.file_format
+    jobs = [("empty", str(directory / f"empty-file.{ext}"), 0, 0)]
+    dominant_project_name = "dominant-project-test"
+    jobs.append(("dominant", str(directory / f"{dominant_project_name}-with-a-very-long_and_unbroken-descriptive-filename-to-test-wrapping.{ext}"), num_rows, 1))
+    jobs += [("part", str(directory / f"test-data-part-{i+1}.{ext}"), num_rows // 2, i + 2) for i in range(num_files)]
+    return _write_files(jobs, spec, workers)
+
+def generate_part_files(directory: Path, num_files: int, total_rows: int, spec: TestDataSpec, workers: int = 1):
+    """Writes `num_files` multi-project files sharing `total_rows` evenly, e.g. for benchmark scale tiers."""
+    directory.mkdir(parents=True, exist_ok=True)
+    jobs = [("part", str(directory / f"part-{i+1:05d}.{spec.file_format}"), total_rows // num_files + (i < total_rows % num_files), i + 2)
+            for i in range(num_files)]
+    return _write_files(jobs, spec, workers)
+
+def _write_files(jobs, spec, workers):
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=multiprocessing.get_context('spawn')) as pool:
+            list(pool.map(_write_file, jobs, [spec] * len(jobs)))
+    else:
+        for job in jobs:
+            _write_file(job, spec)
+    return [path for _, path, _, _ in jobs]
+
+def _write_file(job, spec):
+    kind, path, num_rows, stream = job
+    rng = np.random.default_rng([spec.seed, stream])
+    writer = pq.ParquetWriter(path, INVENTORY_SCHEMA) if spec.file_format == "parquet" else pa_csv.CSVWriter(path, INVENTORY_SCHEMA)
+    try:
+        if kind == "empty":
+            writer.write_table(INVENTORY_SCHEMA.empty_table())
+        for offset in range(0, num_rows, spec.chunk_rows):
+            rows = min(spec.chunk_rows, num_rows - offset)
+            chunk = _dominant_chunk(rng, offset, rows, spec) if kind == "dominant" else _part_chunk(rng, stream - 2, offset, rows, spec)
+            writer.write_table(chunk)
+    finally:
+        writer.close()
+    return path
+
+def _dominant_chunk(rng, offset, rows, spec):
+    # Every logical row i becomes a main-bucket object followed by an archive-bucket object, as in the original fixture.
+    name = "dominant-project-test"
+    index = np.arange(offset, offset + rows)
+    main_sizes = pa.array(rng.integers(10**9, 10**10, rows, endpoint=True), mask=index <= 10)
+    archive_sizes = pa.array(rng.integers(10**8, 10**9, rows, endpoint=True))
+    stamp = np.datetime64(spec.start_date, 's') + np.timedelta64(spec.date_span_days, 'D')
+    interleave = pa.array(np.arange(2 * rows) // 2 + np.tile([0, rows], rows))
+    return pa.table({
+        "project_id": pa.array([name]).take(pa.array(np.zeros(2 * rows, dtype=np.int64))),
+        "bucket_name": pa.array([f"{name}-main-bucket", f"{name}-archive-bucket"]).take(pa.array(np.tile([0, 1], rows))),
+        "object_name": pa.array(['data.csv', 'archive.zip']).take(pa.array(np.tile([0, 1], rows))),
+        "size_bytes": pa.concat_arrays([main_sizes, archive_sizes]).take(interleave),
+        "content_type": pa.array(['text/csv', 'application/zip']).take(pa.array(np.tile([0, 1], rows))),
+        "creation_time_utc": pa.array(np.full(2 * rows, stamp)).cast(INVENTORY_SCHEMA.field("creation_time_utc").type),
+        "updated_time_utc": pa.array(np.full(2 * rows, stamp)).cast(INVENTORY_SCHEMA.field("updated_time_utc").type),
+    }, schema=INVENTORY_SCHEMA)
+
+def _part_chunk(rng, file_index, offset, rows, spec):
+    greek = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta']
+    projects = [f"project-{greek[p % len(greek)]}{'' if p < len(greek) else p // len(greek)}-{file_index}" for p in range(spec.projects)]
+    tiers = [BUCKET_TIERS[b] if b < len(BUCKET_TIERS) else f"tier{b}" for b in range(spec.buckets_per_project)]
+    buckets = pa.array([f"{project}-{tier}" for project in projects for tier in tiers])
+    content_types = [CONTENT_TYPES[c] if c < len(CONTENT_TYPES) else f"application/x-test-{c}" for c in range(spec.content_types)]
+    sizes = np.minimum(rng.lognormal(mean=12, sigma=4, size=rows) * 1024, MAX_OBJECT_SIZE).astype(np.int64)
+    created = np.datetime64(spec.start_date, 's') + rng.integers(0, spec.date_span_days, rows, endpoint=True).astype('timedelta64[D]')
+    ts_type = INVENTORY_SCHEMA.field("creation_time_utc").type
+    return pa.table({
+        "project_id": pa.array(projects).take(pa.array(rng.integers(0, spec.projects, rows))),
+        # Like the original fixture, a bucket's project prefix is drawn independently of the row's project.
+        "bucket_name": buckets.take(pa.array(rng.integers(0, len(buckets), rows))),
+        "object_name": pc.binary_join_element_wise("data/file_", pc.cast(pa.array(np.arange(offset, offset + rows)), pa.string()), ".parquet", ""),
+        "size_bytes": pa.array(sizes),
+        "content_type": pa.array(content_types).take(pa.array(rng.integers(0, spec.content_types, rows))),
+        "creation_time_utc": pa.array(created).cast(ts_type),
+        "updated_time_utc": pa.array(created + np.timedelta64(1, 'D')).cast(ts_type),
+    }, schema=INVENTORY_SCHEMA)
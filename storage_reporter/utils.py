@@ -1,8 +1,5 @@
-import csv
-import random
-from datetime import datetime, timedelta
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont
+import numpy as np
 
 class DynamicExplanations:
     """Generates data-driven text explanations for charts."""
@@ -12,6 +9,19 @@ class DynamicExplanations:
         self.total_objects, self.total_size = self.aggs.get('summary', (0, 0))
 
     def get_all(self):
+        if 'change_summary' in self.aggs:
+            return {
+                "Chart: Object Changes by Type": self.change_types(),
+                "Chart: Net Storage Change by Project": self.net_change('project_changes', 'project_id', 'project'),
+                "Chart: Net Storage Change by Bucket": self.net_change('bucket_changes', 'bucket_name', 'bucket'),
+            }
+        if 'project' in self.aggs:
+            return {
+                "Chart: Top 10 Buckets by Size": self.top_buckets(),
+                "Chart: File Size Distribution": self.file_size_distribution(),
+                "Chart: Cumulative Monthly Storage Growth": self.cumulative_monthly_growth(),
+                "Chart: Cumulative Yearly Storage Growth": self.cumulative_yearly_growth(),
+            }
         return {
             "Chart: Storage Dashboard": self.dashboard(),
             "Chart: Top 10 Projects by Size": self.top_projects(),
@@ -25,21 +35,21 @@ class DynamicExplanations:
     def dashboard(self):
         top_project_df = self.aggs.get('top_projects')
         top_bucket_df = self.aggs.get('top_buckets')
-        top_project_text = "No project data available." if top_project_df.empty else f"The largest project is '{top_project_df['project_id'].iloc[0]}'."
-        top_bucket_text = "No bucket data available." if top_bucket_df.empty else f"The single largest bucket is '{top_bucket_df['bucket_name'].iloc[0]}'."
+        top_project_text = "No project data available." if not num_rows(top_project_df) else f"The largest project is '{column(top_project_df, 'project_id')[0]}'."
+        top_bucket_text = "No bucket data available." if not num_rows(top_bucket_df) else f"The single largest bucket is '{column(top_bucket_df, 'bucket_name')[0]}'."
         return f"This dashboard provides a high-level summary for '{self.source_name}'. It combines critical metrics into a single view. {top_project_text} {top_bucket_text}"
 
     def top_projects(self):
         df = self.aggs.get('top_projects')
-        if df.empty or self.total_size in [None, 0]: return f"No project data found for '{self.source_name}'."
-        name, size = df['project_id'].iloc[0], df['total_size'].iloc[0]
+        if not num_rows(df) or self.total_size in [None, 0]: return f"No project data found for '{self.source_name}'."
+        name, size = column(df, 'project_id')[0], column(df, 'total_size')[0]
         pct = (size / self.total_size) * 100 if self.total_size > 0 else 0
         return f"This chart aggregates storage for each project, showing the top 10. For '{self.source_name}', '{name}' is the largest, accounting for {format_bytes(size)} ({pct:.1f}% of the total). This view is critical for strategic planning and budget allocation."
 
     def top_buckets(self):
         df = self.aggs.get('top_buckets')
-        if df.empty or self.total_size in [None, 0]: return f"No bucket data found for '{self.source_name}'."
-        name, size = df['bucket_name'].iloc[0], df['total_size'].iloc[0]
+        if not num_rows(df) or self.total_size in [None, 0]: return f"No bucket data found for '{self.source_name}'."
+        name, size = column(df, 'bucket_name')[0], column(df, 'total_size')[0]
         pct = (size / self.total_size) * 100 if self.total_size > 0 else 0
         large_bucket_threshold_bytes = 10 * (1024**3)
         concluding_remark = "making it a key target for potential cleanup or data tiering initiatives." if size > large_bucket_threshold_bytes else "which is a manageable size and may not require immediate attention."
@@ -47,12 +57,12 @@ class DynamicExplanations:
 
     # --- DEFINITIVE FIX FOR DYNAMIC TEXT ---
     def distribution_by_project(self):
-        df = self.aggs.get('distribution_by_project')
-        if df.empty:
+        projects = num_rows(self.aggs.get('distribution_by_project'))
+        if not projects:
             return f"No project data found in '{self.source_name}' to create a distribution chart."
 
         # Check the number of projects to mirror the logic in charting.py
-        if len(df) == 1:
+        if projects == 1:
             # Generate text for the single-item BAR CHART case
             return (
                 "This chart shows the total storage for the single project found in this data source. "
@@ -62,39 +72,101 @@ class DynamicExplanations:
         else:
             # Generate text for the multi-item PIE CHART case
             grouping_text = "all projects are displayed."
-            if len(df) > 5:
+            if projects > 5:
                 grouping_text = "the smallest projects are grouped into an 'Others' category for clarity."
 
             return (
                 f"This pie chart illustrates the proportion of total storage consumed by each project. In this dataset "
-                f"of {len(df)} unique projects, {grouping_text} This view is critical for understanding which "
+                f"of {projects} unique projects, {grouping_text} This view is critical for understanding which "
                 "teams or applications are the primary drivers of storage costs."
             )
 
     def file_size_distribution(self):
         df = self.aggs.get('size_distribution')
-        if df.empty: return "No file size data could be calculated."
-        dom = df.loc[df['object_count'].idxmax()]
-        return f"This chart categorizes objects by size. The data in '{self.source_name}' is primarily composed of files in the '{dom['size_category']}' range, with {dom['object_count']:,} objects. This helps understand the nature of the data."
+        if not num_rows(df): return "No file size data could be calculated."
+        counts = column(df, 'object_count')
+        dom = counts.argmax()
+        return f"This chart categorizes objects by size. The data in '{self.source_name}' is primarily composed of files in the '{column(df, 'size_category')[dom]}' range, with {counts[dom]:,} objects. This helps understand the nature of the data."
 
     def cumulative_monthly_growth(self):
-        df = self.aggs.get('monthly_growth')
-        if df.empty or df['month'].isnull().all(): return "No time-series data was available."
-        first, last = df['month'].min().strftime('%Y-%m'), df['month'].max().strftime('%Y-%m')
+        months = _present_dates(self.aggs.get('monthly_growth'), 'month')
+        if not len(months): return "No time-series data was available."
+        first, last = np.datetime_as_string(months.min(), unit='M'), np.datetime_as_string(months.max(), unit='M')
         return (f"This chart displays the cumulative growth of storage on a month-by-month basis from {first} to {last}. "
                 "The upward trend visualizes the rate at which new data is being added, which is useful for observing "
                 "short-to-medium term trends and seasonal changes in storage consumption.")
 
     def cumulative_yearly_growth(self):
-        df = self.aggs.get('yearly_growth')
-        if df.empty or df['year'].isnull().all(): return "No yearly time-series data was available to plot storage growth."
-        first = df['year'].min().strftime('%Y')
-        last = df['year'].max().strftime('%Y')
+        years = _present_dates(self.aggs.get('yearly_growth'), 'year')
+        if not len(years): return "No yearly time-series data was available to plot storage growth."
+        first = np.datetime_as_string(years.min(), unit='Y')
+        last = np.datetime_as_string(years.max(), unit='Y')
         return (f"This chart displays the cumulative growth of storage on a year-by-year basis from {first} to {last}. "
                 "This high-level view is key for understanding the long-term data growth trajectory and for forecasting "
                 "future capacity and budget requirements over multiple years.")
 
 
+    def change_types(self):
+        df = self.aggs.get('change_summary')
+        counts = dict(zip(column(df, 'change').tolist(), column(df, 'object_count').tolist()))
+        net = column(df, 'size_delta').sum()
+        return (f"This chart counts the objects that were added, deleted or resized between the two snapshots: "
+                f"{counts.get('added', 0):,} added, {counts.get('deleted', 0):,} deleted and {counts.get('resized', 0):,} resized, "
+                f"for a net change of {format_signed_bytes(net)}. A high churn relative to net growth points at short-lived data "
+                "that lifecycle rules could expire automatically.")
+
+    def net_change(self, key, name_col, label):
+        df = self.aggs.get(key)
+        if not num_rows(df): return f"No {label} changed between the two snapshots."
+        return (f"This chart shows the {label}s whose stored size changed the most between the two snapshots, growth to the right "
+                f"and shrinkage to the left. '{column(df, name_col)[0]}' moved the most, by {format_signed_bytes(column(df, 'net_size_delta')[0])}.")
+
+
+def _present_dates(table, name):
+    """The non-null dates of a column as datetime64 values."""
+    if not num_rows(table):
+        return np.array([], dtype='datetime64[us]')
+    dates = column(table, name).astype('datetime64[us]')
+    return dates[~np.isnat(dates)]
+
+def column_names(table):
+    """Column names of an aggregate: a pandas DataFrame, a pyarrow Table or a dict of NumPy arrays."""
+    if hasattr(table, 'column_names'):
+        return list(table.column_names)
+    return list(table.columns) if hasattr(table, 'columns') else list(table)
+
+def column(table, name):
+    """One column of an aggregate (see column_names) as a NumPy array. Numeric and timestamp Arrow columns without nulls
+    convert without a copy; strings become an object array."""
+    if hasattr(table, 'column_names'):
+        return table.column(name).to_numpy()
+    return np.asarray(table[name])
+
+def num_rows(table):
+    return len(column(table, column_names(table)[0])) if column_names(table) else 0
+
+def detached(value):
+    """`value` with every pyarrow Table in it, also inside dicts, copied into buffers of its own. A sliced Table pickles
+    the whole buffer it is a view of, so aggs are detached before they are sent to another process."""
+    if hasattr(value, 'column_names'):
+        return value.take(np.arange(value.num_rows))
+    if isinstance(value, dict):
+        return {key: detached(item) for key, item in value.items()}
+    return value
+
+def unique_name(name, taken):
+    """`name`, or `name`-2, -3, ... if it is already in the set `taken`; the result is added to `taken`."""
+    unique, n = name, 1
+    while unique in taken:
+        n += 1
+        unique = f"{name}-{n}"
+    taken.add(unique)
+    return unique
+
+def format_signed_bytes(byte_delta):
+    """Formats a size change with an explicit sign, e.g. '+1.50 GB' or '-20.00 KB'."""
+    return f"{'-' if byte_delta < 0 else '+'}{format_bytes(abs(float(byte_delta)))}"
+
 def format_bytes(byte_count):
     if byte_count is None or not isinstance(byte_count, (int, float)) or byte_count < 0:
         return "0 B"
@@ -106,42 +178,27 @@ def format_bytes(byte_count):
         n += 1
     return f"{byte_count:.2f} {power_labels[n]}"
 
-def create_test_files(directory: Path, num_files: int, num_rows: int):
-    # (function is unchanged)
-    print(f"📝 Generating {num_files + 2} test files with ~{num_rows:,} rows each in '{directory}'...")
-    directory.mkdir(parents=True, exist_ok=True)
-    generated_paths = []
-    headers = ["project_id", "bucket_name", "object_name", "size_bytes", "content_type", "creation_time_utc", "updated_time_utc"]
-    empty_filepath = directory / "empty-file.csv"
-    generated_paths.append(str(empty_filepath))
-    with open(empty_filepath, 'w', newline='', encoding='utf-8') as f: 
-        writer = csv.writer(f)
-        writer.writerow(headers)
-    dominant_project_name = "dominant-project-test"
-    single_project_filepath = directory / f"{dominant_project_name}-with-a-very-long_and_unbroken-descriptive-filename-to-test-wrapping.csv"
-    generated_paths.append(str(single_project_filepath))
-    with open(single_project_filepath, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        for i in range(num_rows):
-            size = random.randint(10**9, 10**10) if i > 10 else ""
-            writer.writerow([dominant_project_name, f'{dominant_project_name}-main-bucket', 'data.csv', size, 'text/csv', datetime.now().isoformat() + 'Z', datetime.now().isoformat() + 'Z'])
-            writer.writerow([dominant_project_name, f'{dominant_project_name}-archive-bucket', 'archive.zip', random.randint(10**8, 10**9), 'application/zip', datetime.now().isoformat() + 'Z', datetime.now().isoformat() + 'Z'])
-    for i in range(num_files):
-        filepath = directory / f"test-data-part-{i+1}.csv"
-        generated_paths.append(str(filepath))
-        projects = [f'project-alpha-{i}', f'project-beta-{i}']
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(headers)
-            for j in range(num_rows // 2):
-                size = int(random.lognormvariate(mu=12, sigma=4) * 1024)
-                created = datetime(2022, 1, 1) + timedelta(days=random.randint(0, 365*2))
-                writer.writerow([random.choice(projects), f"{random.choice(projects)}-{random.choice(['hot', 'archive'])}", f"data/file_{j}.parquet", size, random.choice(['image/jpeg', 'video/mp4']), created.isoformat() + "Z", (created + timedelta(days=1)).isoformat() + "Z"])
+def format_bytes_array(byte_counts):
+    """format_bytes for a whole column at once: the unit of every value is picked with array comparisons, so only the
+    final string formatting runs per value. None, NaN and negative values read '0 B' like in format_bytes."""
+    labels = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+    values = np.asarray(byte_counts, dtype=float)
+    invalid = (np.isnan(values) | (values < 0)).tolist()
+    # Number of whole powers of 1024 below each value, capped at PB; dividing by powers of two is exact.
+    units = sum((values >= 1024.0 ** n).astype(np.int64) for n in range(1, len(labels)))
+    scaled = values / np.power(1024.0, units)
+    return ["0 B" if bad else f"{value:.2f} {labels[unit]}" for value, unit, bad in zip(scaled.tolist(), np.asarray(units).tolist(), invalid)]
+
+def create_test_files(directory: Path, num_files: int, num_rows: int, spec=None, workers: int = 1):
+    from .testdata import TestDataSpec, generate_test_files
+    spec = spec or TestDataSpec()
+    print(f"📝 Generating {num_files + 2} {spec.file_format.upper()} test files with ~{num_rows:,} rows each in '{directory}' (seed {spec.seed})...")
+    generated_paths = generate_test_files(directory, num_files, num_rows, spec, workers=workers)
     assets_dir = directory.parent / "assets"
     assets_dir.mkdir(exist_ok=True)
     logo_path = assets_dir / "test_logo.png"
     if not logo_path.exists():
+        from PIL import Image, ImageDraw, ImageFont
         img = Image.new('RGB', (100, 30), color=(73, 109, 137))
         d = ImageDraw.Draw(img)
         try: f = ImageFont.truetype("arial.ttf", 15)
@@ -0,0 +1,74 @@
+import hashlib
+import os
+from pathlib import Path
+from storage_reporter.analyzer import last_reject_scan, rejected_rows_since
+from storage_reporter.profiling import profile_stage
+
+class Warehouse:
+    """Keeps each source file's typed inventory rows in a table of the persistent DuckDB database the connection
+    is open on, so later runs scan the compressed table instead of re-parsing the file."""
+
+    def __init__(self, con, options_key="", profiler=None):
+        self.con = con
+        self.profiler = profiler
+        # Identifies how files are parsed (e.g. the declared inventory schema); tables loaded with other options are rebuilt.
+        self.options_key = options_key
+        self.ingested = 0
+        self.reused = 0
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS warehouse_sources (
+                path VARCHAR PRIMARY KEY, table_name VARCHAR, file_size BIGINT, mtime_ns BIGINT, options_key VARCHAR,
+                row_count BIGINT, rejected_rows BIGINT, ingested_at TIMESTAMP
+            )
+        """)
+
+    def table_for(self, path, select_sql):
+        """Returns (table_name, rejected_rows) for a source, ingesting it with `select_sql` unless an up-to-date table exists."""
+        resolved = str(Path(path).resolve())
+        stat = os.stat(path)
+        entry = self.con.execute(
+            "SELECT table_name, rejected_rows FROM warehouse_sources WHERE path = ? AND file_size = ? AND mtime_ns = ? AND options_key = ?",
+            [resolved, stat.st_size, stat.st_mtime_ns, self.options_key]
+        ).fetchone()
+        if entry is not None:
+            self.reused += 1
+            return entry
+        table_name = f"source_{hashlib.blake2b(resolved.encode(), digest_size=8).hexdigest()}"
+        watermark = last_reject_scan(self.con)
+        try:
+            self.con.execute("BEGIN TRANSACTION")
+            with profile_stage(self.profiler, 'ingest', source=path) as record:
+                self.con.execute(f"CREATE OR REPLACE TABLE {table_name} AS {select_sql}")
+                if self.profiler:
+                    self.profiler.add_query_metrics(record, self.con)
+            rejected = rejected_rows_since(self.con, watermark)
+            row_count = self.con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+            self.con.execute("DELETE FROM warehouse_sources WHERE path = ?", [resolved])
+            self.con.execute(
+                "INSERT INTO warehouse_sources VALUES (?, ?, ?, ?, ?, ?, ?, now())",
+                [resolved, table_name, stat.st_size, stat.st_mtime_ns, self.options_key, row_count, rejected]
+            )
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+        self.ingested += 1
+        return table_name, rejected
+
+    def prune(self):
+        """Drops the tables of files that were deleted, changed on disk, or loaded with different reader options."""
+        stale = []
+        for path, table_name, file_size, mtime_ns, options_key in self.con.execute(
+            "SELECT path, table_name, file_size, mtime_ns, options_key FROM warehouse_sources"
+        ).fetchall():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stale.append((path, table_name))
+                continue
+            if (stat.st_size, stat.st_mtime_ns, options_key) != (file_size, mtime_ns, self.options_key):
+                stale.append((path, table_name))
+        for path, table_name in stale:
+            self.con.execute(f"DROP TABLE IF EXISTS {table_name}")
+            self.con.execute("DELETE FROM warehouse_sources WHERE path = ?", [path])
+        return len(stale)
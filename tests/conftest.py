@@ -0,0 +1,25 @@
+import csv
+import pytest
+from storage_reporter.analyzer import create_connection
+
+COLUMNS = ("project_id", "bucket_name", "object_name", "size_bytes", "content_type", "creation_time_utc", "updated_time_utc")
+
+@pytest.fixture
+def con():
+    con = create_connection(1)
+    yield con
+    con.close()
+
+@pytest.fixture
+def write_inventory(tmp_path):
+    """Writes rows of (project, bucket, object, size, created, updated) as an inventory CSV under tmp_path and
+    returns its path."""
+    def write(name, rows):
+        path = tmp_path / name
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            for project, bucket, object_name, size, created, updated in rows:
+                writer.writerow((project, bucket, object_name, size, "text/plain", created, updated))
+        return str(path)
+    return write
@@ -0,0 +1,118 @@
+from datetime import datetime
+import duckdb
+import pyarrow as pa
+import pytest
+from storage_reporter.analyzer import DataAnalyzer
+
+def test_analyze_changes_counts_added_deleted_and_resized_objects(write_inventory, con):
+    previous = write_inventory("previous.csv", [
+        ("p1", "b1", "kept", 100, "2024-01-01 00:00:00", "2024-01-01 00:00:00"),
+        ("p1", "b1", "grown", 200, "2024-01-01 00:00:00", "2024-01-01 00:00:00"),
+        ("p1", "b2", "removed", 300, "2024-01-01 00:00:00", "2024-01-01 00:00:00"),
+    ])
+    current = write_inventory("current.csv", [
+        ("p1", "b1", "kept", 100, "2024-01-01 00:00:00", "2024-01-01 00:00:00"),
+        ("p1", "b1", "grown", 250, "2024-01-01 00:00:00", "2024-02-01 00:00:00"),
+        ("p2", "b3", "new", 50, "2024-02-01 00:00:00", "2024-02-01 00:00:00"),
+    ])
+    aggs = DataAnalyzer(con).analyze_changes([previous], [current])
+
+    summary = {row.change: (row.object_count, row.size_delta) for row in aggs['change_summary'].itertuples()}
+    assert summary == {'added': (1, 50), 'deleted': (1, -300), 'resized': (1, 50)}
+    projects = {row.project_id: (row.added, row.deleted, row.resized, row.net_size_delta) for row in aggs['project_changes'].itertuples()}
+    assert projects == {'p1': (0, 1, 1, -250), 'p2': (1, 0, 0, 50)}
+    buckets = {row.bucket_name: (row.added, row.deleted, row.resized, row.net_size_delta) for row in aggs['bucket_changes'].itertuples()}
+    assert buckets == {'b1': (0, 0, 1, 50), 'b2': (0, 1, 0, -300), 'b3': (1, 0, 0, 50)}
+
+def test_analyze_combined_dedup_keeps_the_newest_row(write_inventory, con):
+    older = write_inventory("older.csv", [
+        ("p1", "b1", "shared", 100, "2024-01-01 00:00:00", "2024-01-01 00:00:00"),
+        ("p1", "b1", "only-older", 10, "2024-01-01 00:00:00", "2024-01-01 00:00:00"),
+    ])
+    newer = write_inventory("newer.csv", [
+        ("p1", "b1", "shared", 500, "2024-01-01 00:00:00", "2024-06-01 00:00:00"),
+        # Same name in another bucket: a different object, so not a duplicate.
+        ("p1", "b2", "shared", 7, "2024-01-01 00:00:00", "2024-06-01 00:00:00"),
+    ])
+
+    aggs = DataAnalyzer(con, dedup=True).analyze_combined([older, newer])
+    assert aggs['summary'] == (3, 517)
+    assert aggs['duplicates_removed'] == 1
+    # The row order across files must not matter: the newest updated_time_utc wins.
+    assert DataAnalyzer(con, dedup=True).analyze_combined([newer, older])['summary'] == (3, 517)
+
+    plain = DataAnalyzer(con).analyze_combined([older, newer])
+    assert plain['summary'] == (4, 617)
+    assert plain['duplicates_removed'] is None
+
+# Sizes at the edges of the size bands, with the band each falls in.
+SIZE_BANDS = {0: '0 B', 512: '< 1 KB', 4096: '1 KB - 1 MB', 5 * 1024**2: '1 MB - 1 GB', 3 * 1024**3: '1 GB - 1 TB', 2 * 1024**4: '> 1 TB'}
+
+# Columns each dimension's partial rows are keyed on, as (project, key, period) over the crafted rows.
+DIRECT_KEYS = {
+    'total': "NULL, NULL, NULL",
+    'project': "NULL, project_id, NULL",
+    'bucket': "NULL, bucket_name, NULL",
+    'month': "NULL, NULL, date_trunc('month', created)",
+    'year': "NULL, NULL, date_trunc('year', created)",
+    'size_band': "NULL, size_band, NULL",
+    'project_bucket': "project_id, bucket_name, NULL",
+    'project_month': "project_id, NULL, date_trunc('month', created)",
+    'project_size_band': "project_id, size_band, NULL",
+}
+
+def crafted_rows():
+    rows = []
+    sizes = list(SIZE_BANDS)
+    for i in range(48):
+        project = f"p{i % 3}"
+        # 'shared' appears in every project, so the bucket dimension has to add across projects.
+        bucket = "shared" if i % 4 == 0 else f"{project}-b{i % 2}"
+        created = datetime(2023 + i % 2, 1 + i % 12, 1 + i % 28, i % 24)
+        rows.append((project, bucket, f"obj-{i}", sizes[i % len(sizes)], created, created))
+    return rows
+
+@pytest.mark.parametrize("sample_percent", [None, 100], ids=["exact", "sampled"])
+def test_partials_dimensions_match_direct_group_by(write_inventory, con, sample_percent):
+    rows = crafted_rows()
+    path = write_inventory("inventory.csv", rows)
+    analyzer = DataAnalyzer(con, sample_percent=sample_percent, drilldown_min_percent=0)
+    partials = analyzer._scan_partials(path).to_pylist()
+
+    direct = duckdb.connect()
+    direct.register('crafted', pa.table({
+        'project_id': [r[0] for r in rows], 'bucket_name': [r[1] for r in rows], 'size_bytes': [r[3] for r in rows],
+        'created': [r[4] for r in rows], 'size_band': [SIZE_BANDS[r[3]] for r in rows],
+    }))
+    for dimension, keys in DIRECT_KEYS.items():
+        expected = {
+            (project, key, period): (int(size), count)
+            for project, key, period, size, count in direct.execute(
+                f"SELECT {keys}, SUM(size_bytes), COUNT(*) FROM crafted GROUP BY ALL").fetchall()
+        }
+        actual = {
+            (row['project'], row['key'], row['period']): (int(row['total_size']), row['object_count'])
+            for row in partials if row['dimension'] == dimension
+        }
+        assert actual == expected, dimension
+    # Every grouping set maps to a dimension; none falls through the CASE as NULL.
+    assert None not in {row['dimension'] for row in partials}
+
+def partial_totals(partials):
+    return {
+        (row['dimension'], row['project'], row['key'], row['period']): (int(row['total_size']), row['object_count'])
+        for row in partials.to_pylist()
+    }
+
+def test_merged_partials_equal_one_scan_of_all_files(write_inventory, con):
+    rows = crafted_rows()
+    # Overlapping keys across the files: every project, bucket and month turns up in more than one of them.
+    paths = [write_inventory(f"part-{i}.csv", rows[i::3]) for i in range(3)]
+    analyzer = DataAnalyzer(con, drilldown_min_percent=0)
+
+    merged = analyzer.merge_partials([analyzer._scan_partials(path) for path in paths])
+    assert partial_totals(merged) == partial_totals(analyzer._scan_partials(paths))
+
+    combined = analyzer.analyze_combined(paths)
+    assert combined['summary'] == (len(rows), sum(row[3] for row in rows))
+    assert combined['summary'] == DataAnalyzer(con).analyze_source(paths)['summary']
@@ -0,0 +1,86 @@
+import os
+from storage_reporter.analyzer import DataAnalyzer
+from storage_reporter.cache import AggregateCache
+
+# Sizes near 2**62, so any sum of two overflows BIGINT and only an exact HUGEINT merge gets the totals right.
+BIG = 2**62 + 1
+
+ROWS_A = [
+    ("p1", "b1", "a1", BIG, "2024-01-01 00:00:00", "2024-01-01 00:00:00"),
+    ("p1", "b2", "a2", 17, "2024-02-01 00:00:00", "2024-02-01 00:00:00"),
+]
+ROWS_B = [
+    ("p1", "b1", "b1", BIG + 2, "2024-03-01 00:00:00", "2024-03-01 00:00:00"),
+    ("p2", "b3", "b2", BIG + 4, "2024-03-01 00:00:00", "2024-03-01 00:00:00"),
+]
+
+def cached_summary(con, cache, path):
+    # A fresh analyzer each time, since an analyzer keeps the partials it has already seen.
+    return DataAnalyzer(con, cache=cache).analyze_source(path)['summary']
+
+def test_second_lookup_hits_and_serves_the_same_partials(tmp_path, con, write_inventory):
+    path = write_inventory("a.csv", ROWS_A)
+    cache = AggregateCache(con, tmp_path / "cache.duckdb")
+
+    first = cached_summary(con, cache, path)
+    second = cached_summary(con, cache, path)
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert first == second == (2, BIG + 17)
+
+def test_entries_survive_reopening_the_cache_file(tmp_path, con, write_inventory):
+    path = write_inventory("a.csv", ROWS_A)
+    cache = AggregateCache(con, tmp_path / "cache.duckdb")
+    cached_summary(con, cache, path)
+    cache.close()
+
+    reopened = AggregateCache(con, tmp_path / "cache.duckdb")
+    assert cached_summary(con, reopened, path) == (2, BIG + 17)
+    assert (reopened.misses, reopened.hits) == (0, 1)
+
+def test_changed_size_or_mtime_misses(tmp_path, con, write_inventory):
+    path = write_inventory("a.csv", ROWS_A)
+    cache = AggregateCache(con, tmp_path / "cache.duckdb")
+    cached_summary(con, cache, path)
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cached_summary(con, cache, path) == (2, BIG + 17)
+    assert (cache.misses, cache.hits) == (2, 0)
+
+    write_inventory("a.csv", ROWS_A[:1])
+    assert cached_summary(con, cache, path) == (1, BIG)
+    assert (cache.misses, cache.hits) == (3, 0)
+
+def test_other_reader_options_miss(tmp_path, con, write_inventory):
+    path = write_inventory("a.csv", ROWS_A)
+    cached_summary(con, AggregateCache(con, tmp_path / "cache.duckdb", options_key="one"), path)
+    con.execute("DETACH agg_cache")
+
+    other = AggregateCache(con, tmp_path / "cache.duckdb", options_key="two")
+    cached_summary(con, other, path)
+    assert (other.misses, other.hits) == (1, 0)
+
+def test_combined_merges_cached_and_fresh_partials_exactly(tmp_path, con, write_inventory):
+    a = write_inventory("a.csv", ROWS_A)
+    b = write_inventory("b.csv", ROWS_B)
+    cache = AggregateCache(con, tmp_path / "cache.duckdb")
+    cached_summary(con, cache, a)
+
+    aggs = DataAnalyzer(con, cache=cache).analyze_combined([a, b])
+    assert (cache.misses, cache.hits) == (2, 1)
+    assert aggs['summary'] == (4, 3 * BIG + 23)
+    assert aggs['summary'] == DataAnalyzer(con).analyze_source([a, b])['summary']
+    projects = {row.project_id: row.total_size for row in aggs['project_listing'].itertuples()}
+    assert projects == {'p1': float(2 * BIG + 19), 'p2': float(BIG + 4)}
+
+def test_prune_drops_entries_of_missing_and_changed_files(tmp_path, con, write_inventory):
+    a = write_inventory("a.csv", ROWS_A)
+    b = write_inventory("b.csv", ROWS_B)
+    cache = AggregateCache(con, tmp_path / "cache.duckdb")
+    cached_summary(con, cache, a)
+    cached_summary(con, cache, b)
+
+    os.remove(a)
+    assert cache.prune() == 1
+    assert cached_summary(con, cache, b) == (2, 2 * BIG + 6)
+    assert cache.hits == 1
@@ -0,0 +1,56 @@
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from storage_reporter.analyzer import DataAnalyzer
+from storage_reporter.export import SectionExporter, section_table
+
+BIG = 2**62 + 1
+
+ROWS = [
+    ("p1", "b1", "a", BIG, "2024-01-05 00:00:00", "2024-01-05 00:00:00"),
+    ("p1", "b2", "b", BIG, "2024-02-05 00:00:00", "2024-02-05 00:00:00"),
+    ("p2", "b1", "a", 10, "2023-12-01 00:00:00", "2023-12-01 00:00:00"),
+]
+
+@pytest.fixture
+def inventory(write_inventory):
+    return write_inventory("inventory.csv", ROWS)
+
+def combined_aggs(con, path, **options):
+    return DataAnalyzer(con, arrow=True, **options).analyze_combined([path])
+
+def test_schema_is_the_same_for_plain_sampled_and_deduplicated_runs(con, inventory):
+    schemas = [section_table("Combined", combined_aggs(con, inventory, **options)).schema
+               for options in ({}, {'sample_percent': 100}, {'dedup': True})]
+    assert schemas[0] == schemas[1] == schemas[2]
+    assert not [field.name for field in schemas[0] if pa.types.is_null(field.type)]
+    assert schemas[0].field('total_size').type == pa.decimal128(38, 0)
+
+def test_parquet_keeps_exact_totals_and_rows(tmp_path, con, inventory):
+    exporter = SectionExporter(tmp_path / "export", "parquet")
+    path = exporter.write("combined", "Combined", combined_aggs(con, inventory))
+    row = pq.read_table(path).to_pylist()[0]
+    assert (row['title'], row['object_count'], int(row['total_size'])) == ("Combined", 3, 2 * BIG + 10)
+    assert [(p['project_id'], p['object_count']) for p in row['project_listing']] == [('p1', 2), ('p2', 1)]
+    assert row['duplicates_removed'] is None and row['estimate_objects_margin'] is None
+
+def test_json_writes_integers_and_iso_timestamps(tmp_path, con, inventory):
+    exporter = SectionExporter(tmp_path / "export", "json")
+    row = json.loads(exporter.write("combined", "Combined", combined_aggs(con, inventory)).read_text())
+    assert row['total_size'] == 2 * BIG + 10
+    assert [month['month'] for month in row['monthly_growth']] == ['2023-12-01T00:00:00', '2024-01-01T00:00:00', '2024-02-01T00:00:00']
+
+def test_repeated_names_get_their_own_files(tmp_path, con, inventory):
+    exporter = SectionExporter(tmp_path / "export", "arrow")
+    aggs = combined_aggs(con, inventory)
+    paths = [exporter.write("inventory", f"Analysis {i}", aggs) for i in range(3)]
+    assert [p.name for p in paths] == ["inventory.arrow", "inventory-2.arrow", "inventory-3.arrow"]
+    index = json.loads(exporter.finish().read_text())
+    assert index == {'format': 'arrow', 'sections': [{'title': f"Analysis {i}", 'file': p.name} for i, p in enumerate(paths)]}
+    with pa.ipc.open_file(paths[1]) as reader:
+        assert reader.read_all().column('title').to_pylist() == ["Analysis 1"]
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="export format"):
+        SectionExporter(tmp_path / "export", "xlsx")
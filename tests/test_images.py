@@ -0,0 +1,57 @@
+import io
+import fpdf.image_parsing
+import fpdf.syntax
+from fpdf import FPDF
+from PIL import Image
+from pypdf import PdfReader
+import pytest
+from storage_reporter.images import ImageOptimizer, compression_level
+
+@pytest.fixture
+def png(tmp_path):
+    path = tmp_path / "logo.png"
+    Image.new('RGBA', (2000, 500), (30, 60, 90, 255)).save(path)
+    return path
+
+def test_images_are_resampled_to_the_printed_density(png):
+    prepared = ImageOptimizer(dpi=150).prepare(png, w=50)
+    assert prepared.size == (round(50 / 25.4 * 150), round(50 / 25.4 * 150 / 4))
+
+def test_lossless_images_already_small_enough_pass_through(png):
+    assert ImageOptimizer(dpi=150).prepare(str(png), w=500) == str(png)
+
+@pytest.mark.parametrize("encoding, check", [
+    ('quantize', lambda img: img.mode == 'P'),
+    ('jpeg', lambda data: data[:2] == b'\xff\xd8'),
+])
+def test_lossy_encodings(png, encoding, check):
+    assert check(ImageOptimizer(dpi=150, encoding=encoding).prepare(png, w=50))
+
+def test_paths_are_prepared_once_unless_caching_is_off(png):
+    optimizer = ImageOptimizer(dpi=150)
+    assert optimizer.prepare(png, h=9) is optimizer.prepare(png, h=9)
+    assert len(optimizer._prepared) == 1
+
+    charts = [optimizer.prepare(png, w=170, cache=False) for _ in range(2)]
+    assert charts[0] is not charts[1]
+    assert len(optimizer._prepared) == 1
+
+def test_a_cached_logo_is_embedded_once(png):
+    optimizer = ImageOptimizer(dpi=150)
+    pdf = FPDF()
+    for _ in range(3):
+        pdf.add_page()
+        pdf.image(optimizer.prepare(png, h=9), x=10, y=10, h=9)
+    images = {ref.idnum for page in PdfReader(io.BytesIO(pdf.output())).pages
+              for ref in page['/Resources']['/XObject'].values()}
+    assert len(images) == 1
+
+def test_compression_level_is_restored_after_the_block():
+    before = fpdf.image_parsing.SETTINGS.compression_level, fpdf.syntax.PDFContentStream._COMPRESSION_LEVEL
+    with compression_level(1):
+        assert fpdf.image_parsing.SETTINGS.compression_level == fpdf.syntax.PDFContentStream._COMPRESSION_LEVEL == 1
+    assert (fpdf.image_parsing.SETTINGS.compression_level, fpdf.syntax.PDFContentStream._COMPRESSION_LEVEL) == before
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError, match="image encoding"):
+        ImageOptimizer(encoding='webp')
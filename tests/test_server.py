@@ -0,0 +1,75 @@
+from pathlib import Path
+import matplotlib.pyplot as plt
+import pytest
+from storage_reporter import server
+from storage_reporter.config import load_config
+from storage_reporter.server import ReportServer
+
+ROWS = [
+    ("p1", "b1", f"obj-{i}", 1000 * (i + 1), f"2024-0{1 + i % 6}-01 00:00:00", f"2024-0{1 + i % 6}-02 00:00:00")
+    for i in range(30)
+]
+
+@pytest.fixture
+def config():
+    return load_config(require_inputs=False)
+
+@pytest.fixture
+def worker(config, monkeypatch):
+    """Sets this process up as a report worker; the worker globals are put back afterwards."""
+    monkeypatch.setattr(server, '_worker_config', None)
+    monkeypatch.setattr(server, '_worker_con', None)
+    server._init_report_worker(config)
+    yield server._worker_con
+    server._worker_con.close()
+
+def run_job(tmp_path, files, name, options=None, overrides=None):
+    return server._run_report_job({'files': files, 'outdir': str(tmp_path / name / "out"), 'config': overrides or {}, 'options': options or {}})
+
+def test_jobs_share_the_worker_connection_without_leaking_state(tmp_path, write_inventory, worker):
+    files = [write_inventory("a.csv", ROWS)]
+
+    first = run_job(tmp_path, files, "first", {'profile': str(tmp_path / "profile.json"), 'memory_limit': '512MB'})
+    assert Path(first['report']).exists() and (tmp_path / "profile.json").exists()
+    style = dict(plt.rcParams)
+    # The output directory does not exist yet and no aggregate cache creates it.
+    other = run_job(tmp_path, files, "second", {'no_cache': True}, {'chart_style': 'dark_background'})
+    assert Path(other['report']).exists()
+    run_job(tmp_path, files, "third")
+
+    assert worker is server._worker_con
+    databases = {name for name, in worker.execute("SELECT database_name FROM duckdb_databases() WHERE NOT internal").fetchall()}
+    assert databases == {'memory'}
+    assert worker.execute("SELECT current_setting('enable_profiling')").fetchone()[0] in (None, '')
+    assert worker.execute("SELECT current_setting('memory_limit')").fetchone()[0] != '488.2 MiB'
+    # The dark_background job's style does not carry over into the next job's charts.
+    assert {key: value for key, value in plt.rcParams.items() if style[key] != value} == {}
+
+def test_submit_rejects_malformed_jobs(tmp_path, config, write_inventory):
+    report_server = ReportServer(config, max_jobs=1)
+    try:
+        with pytest.raises(ValueError, match="non-empty list"):
+            report_server.submit({'files': []})
+        with pytest.raises(ValueError, match="not found"):
+            report_server.submit({'files': [str(tmp_path / "missing.csv")]})
+        path = write_inventory("a.csv", ROWS)
+        with pytest.raises(ValueError, match="unknown config keys: nonsense"):
+            report_server.submit({'files': [path], 'config': {'nonsense': 1}})
+        with pytest.raises(ValueError, match="invalid options"):
+            report_server.submit({'files': [path], 'options': {'colour': 'red'}})
+        assert report_server.jobs == {}
+    finally:
+        report_server.close()
+
+def test_jobs_for_one_outdir_run_one_after_another(tmp_path, config, write_inventory):
+    path = write_inventory("a.csv", ROWS)
+    report_server = ReportServer(config, max_jobs=2)
+    try:
+        outdir = str(tmp_path / "shared")
+        ids = [report_server.submit({'files': [path], 'outdir': outdir}) for _ in range(2)]
+        assert report_server.status(ids[1])['status'] == 'queued'
+        statuses = [report_server.wait(job_id, timeout=300) for job_id in ids]
+        assert [status['status'] for status in statuses] == ['done', 'done']
+        assert statuses[1]['report'] == str(Path(outdir) / "Storage_Analysis_Report.pdf")
+    finally:
+        report_server.close()
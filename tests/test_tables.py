@@ -0,0 +1,62 @@
+import io
+from fpdf import FPDF
+from pypdf import PdfReader
+import pytest
+from storage_reporter.tables import GlyphWidths, TableRenderer, fitting_font_size
+
+@pytest.mark.parametrize("style", ['', 'B'])
+@pytest.mark.parametrize("size", [6, 10, 13.5])
+def test_glyph_widths_match_fpdf(style, size):
+    pdf = FPDF()
+    pdf.set_font('Helvetica', style, size)
+    glyphs = GlyphWidths()
+    for text in ["", "project-alpha-0", "WWW iii 1,234.56 GB", "mixed Case / with-dashes_and_underscores"]:
+        assert glyphs.width(text, 'Helvetica', style, size) == pytest.approx(pdf.get_string_width(text))
+
+def test_column_widths_fit_the_widest_header_or_cell():
+    glyphs = GlyphWidths()
+    renderer = TableRenderer(FPDF(), glyphs)
+    header = ["Project", "Total Size"]
+    columns = [["a", "a-much-longer-project-name", "b"], ["1.00 GB", "2.00 GB", "3.00 GB"]]
+    widths = renderer.column_widths(header, columns, 10, ['', ''], max_width=1000)
+    padding = 2 * TableRenderer.CELL_PADDING
+    assert widths[0] == pytest.approx(glyphs.width("a-much-longer-project-name", 'Helvetica', '', 10) + padding)
+    # The bold header is wider than any of the column's values.
+    assert widths[1] == pytest.approx(glyphs.width("Total Size", 'Helvetica', 'B', 10) + padding)
+
+def test_column_widths_find_the_widest_of_many_values():
+    glyphs = GlyphWidths()
+    renderer = TableRenderer(FPDF(), glyphs)
+    column = [f"row-{i}" for i in range(5 * TableRenderer.WIDTH_CANDIDATES)]
+    column[777] = "the-single-widest-value-of-the-column"
+    width, = renderer.column_widths(["Name"], [column], 10, [''], max_width=1000)
+    assert width == pytest.approx(glyphs.width(column[777], 'Helvetica', '', 10) + 2 * TableRenderer.CELL_PADDING)
+
+def test_column_widths_scale_down_together_to_the_page():
+    renderer = TableRenderer(FPDF())
+    columns = [["x" * 80], ["y" * 40]]
+    natural = renderer.column_widths(["A", "B"], columns, 10, ['', ''], max_width=10_000)
+    fitted = renderer.column_widths(["A", "B"], columns, 10, ['', ''], max_width=100)
+    assert sum(fitted) == pytest.approx(100)
+    assert fitted[0] / fitted[1] == pytest.approx(natural[0] / natural[1])
+
+def test_long_tables_continue_on_new_pages_under_a_repeated_header():
+    pdf = FPDF()
+    pdf.add_page()
+    rows = 120
+    TableRenderer(pdf).write(["Bucket", "Objects"], [[f"bucket-{i}" for i in range(rows)], [str(i) for i in range(rows)]])
+    assert pdf.page_no() > 1
+    pages = [page.extract_text() for page in PdfReader(io.BytesIO(pdf.output())).pages]
+    assert all("Bucket" in text for text in pages)
+    written = [line for text in pages for line in text.splitlines() if line.startswith("bucket-")]
+    assert len(written) == rows
+
+@pytest.mark.parametrize("available", [20, 50, 120])
+def test_fitting_font_size_is_the_largest_that_fits(available):
+    glyphs = GlyphWidths()
+    text = "A long section title that has to shrink"
+    size = fitting_font_size(glyphs, text, 'Helvetica', 'B', 24, available)
+    if size > 6:
+        assert glyphs.width(text, 'Helvetica', 'B', size) < available
+    if size < 24:
+        assert glyphs.width(text, 'Helvetica', 'B', size + 1) >= available
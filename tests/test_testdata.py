@@ -0,0 +1,38 @@
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+# The module, not its names: pytest would try to collect TestDataSpec as a test class.
+from storage_reporter import testdata
+from storage_reporter.testdata import CONTENT_TYPES, INVENTORY_SCHEMA, generate_part_files, generate_test_files
+
+def read(path):
+    return pq.read_table(path) if path.endswith(".parquet") else pa_csv.read_csv(path)
+
+@pytest.mark.parametrize("projects, buckets, content_types", [(1, 1, 1), (3, 2, 4), (10, 6, len(CONTENT_TYPES) + 4)])
+def test_part_files_have_the_requested_cardinalities(tmp_path, projects, buckets, content_types):
+    spec = testdata.TestDataSpec(projects=projects, buckets_per_project=buckets, content_types=content_types)
+    paths = generate_part_files(tmp_path, 2, 4001, spec)
+    tables = [read(path) for path in paths]
+    assert [t.num_rows for t in tables] == [2001, 2000]
+    for table in tables:
+        assert len(table.column('project_id').unique()) == projects
+        assert len(table.column('bucket_name').unique()) == projects * buckets
+        assert len(table.column('content_type').unique()) == content_types
+
+def test_the_same_seed_writes_the_same_files(tmp_path):
+    spec = testdata.TestDataSpec(file_format="parquet")
+    first = generate_part_files(tmp_path / "first", 2, 1000, spec)
+    second = generate_part_files(tmp_path / "second", 2, 1000, spec)
+    assert [read(p) for p in first] == [read(p) for p in second]
+    assert read(first[0]).column_names == INVENTORY_SCHEMA.names
+
+def test_test_files_include_the_empty_and_dominant_fixtures(tmp_path):
+    paths = generate_test_files(tmp_path, 2, 100, testdata.TestDataSpec())
+    rows = [read(path).num_rows for path in paths]
+    # The empty file, the dominant project's two objects per logical row, then two parts of half the rows each.
+    assert rows == [0, 200, 50, 50]
+
+@pytest.mark.parametrize("field", ["projects", "buckets_per_project", "content_types"])
+def test_cardinalities_below_one_are_rejected(field):
+    with pytest.raises(ValueError, match=field.replace('_', ' ')):
+        testdata.TestDataSpec(**{field: 0})